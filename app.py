@@ -1,22 +1,74 @@
-from flask import Flask, render_template_string, request, send_file, jsonify
-import asyncio
+from flask import Flask, Response, render_template_string, request, send_file, send_from_directory, jsonify
+import atexit
+import io
+import json
 import threading
+import time
 import uuid
 import os
 
 # Import Scrapers
-from scrapers.amazon import AmazonScraper
-from scrapers.flipkart import FlipkartScraper
-from scrapers.blinkit import BlinkitScraper
-from scrapers.zepto import ZeptoScraper
-from scrapers.jiomart import JiomartScraper
-from scrapers.swiggy import SwiggyScraper
-from scrapers.bigbasket import BigBasketScraper
+from scrapers.registry import SCRAPERS, job_options
+from scrapers.broker import broker_from_env
+from scrapers.canonical import dedupe, parse_urls
+from scrapers.browser_pool import pool_from_env
+from scrapers.workers import WorkerLoops
+from scrapers.process_workers import ProcessWorkers
+from scrapers.http_fetch import FETCH_STATS
+from scrapers.detail_cache import DETAIL_CACHE
+from scrapers.checkpoints import CHECKPOINTS
+from scrapers.job_store import JOB_STORE
+from scrapers.output import OUTPUT_DIR, read_partial
+from scrapers.rate_limit import RATE_LIMITER
+from scrapers.metrics import REGISTRY
+from scrapers.profiling import wants_profile
+from scrapers.scheduler import JobScheduler, QueueFull, PRIORITY_SEARCH, PRIORITY_REVIEWS, bulk_priority
 
 app = Flask(__name__)
 
-# Global dictionary to store job status
-JOBS = {}
+# Job status records live in SQLite so every gunicorn worker serves the same /status
+JOBS = JOB_STORE
+SSE_MAX_SECONDS = int(os.environ.get("SSE_MAX_SECONDS", 300))
+# Each open stream holds a gunicorn thread, so only part of them may stream; the rest keep serving requests
+SSE_MAX_STREAMS = int(os.environ.get("SSE_MAX_STREAMS", int(os.environ.get("GUNICORN_THREADS", 16)) // 2))
+SSE_SLOTS = threading.BoundedSemaphore(SSE_MAX_STREAMS)
+
+# Long-lived event loops shared by all jobs. Each loop owns one Playwright driver and
+# a Chromium pool, so the browser budget is WORKER_LOOPS * MAX_BROWSERS.
+# EXECUTION_MODE=process runs the loops in WORKER_PROCESSES separate processes instead, and
+# EXECUTION_MODE=broker runs nothing here: jobs go to the broker for `python -m scrapers.node` workers.
+BROKER = None
+if os.environ.get("EXECUTION_MODE") == "broker":
+    BROKER = broker_from_env(JOBS)
+    BULK_SHARD_SIZE = int(os.environ.get("BULK_SHARD_SIZE", 200)) # Bulk lists above this are split across nodes
+    WORKERS = None
+    LOOP_COUNT = 0
+elif os.environ.get("EXECUTION_MODE") == "process":
+    WORKER_PROCESSES = int(os.environ.get("WORKER_PROCESSES", os.cpu_count() or 1))
+    WORKERS = ProcessWorkers(WORKER_PROCESSES, pool_from_env, loops_per_process=int(os.environ.get("WORKER_LOOPS", 1)),
+                             max_retries=int(os.environ.get("WORKER_RETRIES", 1)))
+    LOOP_COUNT = WORKER_PROCESSES * int(os.environ.get("WORKER_LOOPS", 1))
+else:
+    WORKERS = WorkerLoops(int(os.environ.get("WORKER_LOOPS", 1)), pool_from_env)
+    atexit.register(WORKERS.stop) # Browsers and HTTP/2 connections close with the web worker
+    LOOP_COUNT = len(WORKERS.loops)
+
+# Admission control: at most MAX_RUNNING_JOBS run at once (defaults to the browser
+# context budget, capped by CPU count), the rest wait in a bounded priority queue.
+BROWSER_BUDGET = LOOP_COUNT * int(os.environ.get("MAX_BROWSERS", 2)) * int(os.environ.get("CONTEXTS_PER_BROWSER", 4))
+SCHEDULER = None if BROKER else JobScheduler(
+    WORKERS, JOBS,
+    max_running=int(os.environ.get("MAX_RUNNING_JOBS", min(BROWSER_BUDGET, os.cpu_count() or 1))),
+    max_queued=int(os.environ.get("MAX_QUEUED_JOBS", 50)),
+)
+
+# Capacity gauges for /metrics, read at scrape time
+if SCHEDULER:
+    REGISTRY.gauge("scraper_queued_jobs", "Jobs waiting in the scheduler queue", lambda: SCHEDULER.stats()["queued"])
+    REGISTRY.gauge("scraper_running_jobs", "Jobs running on the worker loops", lambda: SCHEDULER.stats()["running"])
+REGISTRY.gauge("scraper_domain_rate", "Requests/second the rate limiter currently allows per domain",
+               lambda: {(host,): s["rate"] for host, s in RATE_LIMITER.stats().items()}, labels=("domain",))
+REGISTRY.gauge("scraper_detail_cache_entries", "Products in the detail cache", lambda: DETAIL_CACHE.stats()["entries"])
 
 HTML_TEMPLATE = '''
 <!DOCTYPE html>
@@ -38,6 +90,9 @@ HTML_TEMPLATE = '''
         .status-text { font-size: 13px; color: #333; margin-bottom: 6px; font-weight: 500; }
         .bar-container { width: 100%; background: #ddd; height: 8px; border-radius: 4px; overflow: hidden; }
         .bar { height: 100%; width: 0%; background: #007bff; transition: width 0.3s; }
+        .option { display: block; font-size: 13px; color: #555; margin-bottom: 10px; text-align: left; }
+        .option input { width: auto; margin: 0 6px 0 0; }
+        .partial-link { display: inline-block; margin-top: 6px; font-size: 12px; color: #007bff; }
     </style>
     <script>
         async function startJob(event, type) {
@@ -58,41 +113,86 @@ HTML_TEMPLATE = '''
             const jobId = data.job_id;
 
             progressBox.style.display = 'block';
-            pollStatus(jobId, form);
+            if (!response.ok) {
+                form.querySelector('.status-text').innerText = "Error: " + data.error;
+                btn.disabled = false;
+                btn.innerText = "Start Again";
+                return;
+            }
+            watchStatus(jobId, form);
+        }
+
+        // Server pushes status over SSE when the job changes; polling is only used if EventSource fails
+        function watchStatus(jobId, form) {
+            if (!window.EventSource) return pollStatus(jobId, form);
+            const source = new EventSource(`/events/${jobId}`);
+            source.onmessage = (event) => {
+                if (renderStatus(JSON.parse(event.data), jobId, form)) source.close();
+            };
+            source.onerror = () => {
+                // EventSource retries dropped streams itself and only gives up when the endpoint is unusable
+                if (source.readyState === EventSource.CLOSED) pollStatus(jobId, form);
+            };
         }
 
         function pollStatus(jobId, form) {
+            const interval = setInterval(async () => {
+                const res = await fetch(`/status/${jobId}`);
+                if (renderStatus(await res.json(), jobId, form)) clearInterval(interval);
+            }, 1000);
+        }
+
+        // Returns true once the job is finished
+        function renderStatus(data, jobId, form) {
             const statusText = form.querySelector('.status-text');
             const progressBar = form.querySelector('.bar');
             const btn = form.querySelector('button');
+
+            statusText.innerText = data.status;
             
-            const interval = setInterval(async () => {
-                const res = await fetch(`/status/${jobId}`);
-                const data = await res.json();
-                
-                statusText.innerText = data.status;
-                
-                if (data.progress && data.total) {
-                    const pct = (data.progress / data.total) * 100;
-                    progressBar.style.width = pct + "%";
-                } else if (data.done) {
-                    progressBar.style.width = "100%";
-                } else {
-                    progressBar.style.width = "10%"; 
-                }
-                
-                if (data.done) {
-                    clearInterval(interval);
-                    if (data.filename) {
-                        statusText.innerText = "Done! Downloading...";
-                        window.location.href = `/download/${data.filename}`;
-                    } else {
-                        statusText.innerText = "Error: " + data.status;
-                    }
-                    btn.disabled = false;
-                    btn.innerText = "Start Again";
-                } 
-            }, 1000);
+            if (data.progress && data.total) {
+                const pct = (data.progress / data.total) * 100;
+                progressBar.style.width = pct + "%";
+            } else if (data.done) {
+                progressBar.style.width = "100%";
+            } else {
+                progressBar.style.width = "10%"; 
+            }
+
+            let partialLink = form.querySelector('.partial-link');
+            if (data.partial_file && !data.done && !partialLink) {
+                partialLink = document.createElement('a');
+                partialLink.className = 'partial-link';
+                partialLink.href = `/download/${jobId}?partial=1`;
+                partialLink.innerText = "Download rows so far";
+                form.querySelector('.progress-box').appendChild(partialLink);
+            }
+            if (partialLink && data.done) partialLink.remove();
+            
+            if (!data.done) return false;
+            if (data.debug_file && !form.querySelector('.debug-link')) {
+                const debugLink = document.createElement('a');
+                debugLink.className = 'partial-link debug-link';
+                debugLink.href = `/status/${jobId}/debug`;
+                debugLink.innerText = "Download debug profile";
+                form.querySelector('.progress-box').appendChild(debugLink);
+            }
+            if (data.merged_file && !form.querySelector('.merged-link')) {
+                const mergedLink = document.createElement('a');
+                mergedLink.className = 'partial-link merged-link';
+                mergedLink.href = `/download/${jobId}?file=merged`;
+                mergedLink.innerText = "Download full review history";
+                form.querySelector('.progress-box').appendChild(mergedLink);
+            }
+            if (data.filename) {
+                statusText.innerText = data.partial || data.merged_file ? `${data.status}. Downloading...` : "Done! Downloading...";
+                window.location.href = `/download/${jobId}`;
+            } else {
+                statusText.innerText = "Error: " + data.status;
+            }
+            btn.disabled = false;
+            btn.innerText = "Start Again";
+            return true;
         }
     </script>
 </head>
@@ -111,6 +211,7 @@ HTML_TEMPLATE = '''
                 <select name="platform" required>
                     <option value="amazon">Amazon</option>
                     <option value="flipkart">Flipkart</option>
+                    <option value="all">All platforms (price comparison)</option>
                     <!-- <option value="blinkit">Blinkit</option> -->
                     <!-- <option value="zepto">Zepto</option> -->
                     <!-- <option value="jiomart">Jiomart</option> -->
@@ -118,6 +219,7 @@ HTML_TEMPLATE = '''
                     <!-- <option value="bigbasket">Big Basket</option> -->
                 </select>
                 <input type="text" name="url" placeholder="Paste Search Link OR Keyword" required>
+                <label class="option"><input type="checkbox" name="debug" value="1"> Capture debug profile</label>
                 <button type="submit">Get Products CSV</button>
                 
                 <div class="progress-box">
@@ -142,6 +244,7 @@ HTML_TEMPLATE = '''
                     <!-- <option value="bigbasket">Big Basket</option> -->
                 </select>
                 <textarea name="urls" rows="4" placeholder="Paste Product URLs (one per line)" required></textarea>
+                <label class="option"><input type="checkbox" name="debug" value="1"> Capture debug profile</label>
                 <button type="submit">Get Products XLSX</button>
                 
                 <div class="progress-box">
@@ -161,6 +264,8 @@ HTML_TEMPLATE = '''
                     <option value="flipkart">Flipkart (Limited)</option>
                 </select>
                 <input type="text" name="url" placeholder="Paste Product Page Link" required>
+                <label class="option"><input type="checkbox" name="since_last_run" value="1"> Only new since last run</label>
+                <label class="option"><input type="checkbox" name="debug" value="1"> Capture debug profile</label>
                 <button type="submit">Get Reviews CSV</button>
                 
                 <div class="progress-box">
@@ -175,17 +280,50 @@ HTML_TEMPLATE = '''
 '''
 
 def get_scraper(platform, job_id):
-    if platform == 'amazon': return AmazonScraper(job_id, JOBS)
-    if platform == 'flipkart': return FlipkartScraper(job_id, JOBS)
-    if platform == 'blinkit': return BlinkitScraper(job_id, JOBS)
-    if platform == 'zepto': return ZeptoScraper(job_id, JOBS)
-    if platform == 'jiomart': return JiomartScraper(job_id, JOBS)
-    if platform == 'swiggy': return SwiggyScraper(job_id, JOBS)
-    if platform == 'bigbasket': return BigBasketScraper(job_id, JOBS)
-    return None
-
-def run_async_job(func, *args):
-    asyncio.run(func(*args))
+    cls = SCRAPERS.get(platform)
+    if cls is None: return None
+    scraper = cls(job_id, JOBS)
+    # Seconds of staleness this job accepts from the detail cache; 0 forces fresh page loads
+    scraper.max_staleness = request.form.get('max_staleness', None, type=float)
+    scraper.output_format = 'parquet' if request.form.get('format') == 'parquet' else None # Typed columnar export for pipelines
+    scraper.debug = wants_profile(request.form.get('debug') == '1') # Also on for a DEBUG_SAMPLE_RATE share of jobs
+    return scraper
+
+def requested_priority(priority):
+    """A client may push its job further back with a `priority` field, never ahead of the size-based one."""
+    return max(priority, request.form.get('priority', priority, type=int))
+
+def enqueue(job_id, func, arg, priority):
+    priority = requested_priority(priority)
+    func.__self__.job_type = func.__name__.removeprefix("run_")
+    if BROKER:
+        scraper = func.__self__
+        BROKER.enqueue(job_id, scraper.PLATFORM, func.__name__, arg, job_options(scraper), priority)
+        return jsonify({"job_id": job_id})
+    JOBS.claim(job_id) # This process holds the queue; if it dies the job shows as interrupted and can be resumed
+    try:
+        SCHEDULER.submit(job_id, func, arg, priority=priority)
+    except QueueFull as e:
+        JOBS.pop(job_id, None)
+        return jsonify({"error": str(e)}), 429
+    return jsonify({"job_id": job_id})
+
+def enqueue_shards(job_id, scraper, url_text, priority):
+    """Splits a big brokered bulk job into BULK_SHARD_SIZE slices of its deduped URLs so several nodes
+    work on it at once. Each shard is a job of its own; the parent job shows their combined progress
+    and a final merge step writes its output from the rows the shards checkpointed."""
+    unique, _ = dedupe(scraper.PLATFORM, parse_urls(url_text))
+    if len(unique) <= BULK_SHARD_SIZE: return enqueue(job_id, scraper.run_bulk, url_text, priority)
+    shards = []
+    for n, start in enumerate(range(0, len(unique), BULK_SHARD_SIZE)):
+        shard_id, shard_text = f"{job_id}.{n}", "\n".join(unique[start:start + BULK_SHARD_SIZE])
+        JOBS.create(shard_id, status="Queued", done=False)
+        CHECKPOINTS.start_job(shard_id, scraper.PLATFORM, shard_text)
+        shards.append((shard_id, shard_text))
+    JOBS.update(job_id, status=f"Queued ({len(shards)} shards)", shard_count=len(shards))
+    BROKER.enqueue_shards(job_id, scraper.PLATFORM, shards, ",".join(shard_id for shard_id, _ in shards),
+                          job_options(scraper), requested_priority(priority))
+    return jsonify({"job_id": job_id, "shards": len(shards)})
 
 @app.route('/')
 def index(): return render_template_string(HTML_TEMPLATE)
@@ -195,12 +333,11 @@ def start_scrape():
     platform = request.form.get('platform')
     url = request.form.get('url')
     job_id = str(uuid.uuid4())
-    JOBS[job_id] = {"status": "Queued", "done": False}
+    JOBS.create(job_id, status="Queued", done=False)
     
     scraper = get_scraper(platform, job_id)
     if scraper:
-        threading.Thread(target=run_async_job, args=(scraper.run_search, url)).start()
-        return jsonify({"job_id": job_id})
+        return enqueue(job_id, scraper.run_search, url, PRIORITY_SEARCH)
     return jsonify({"error": "Invalid Platform"}), 400
 
 @app.route('/start_bulk_scrape', methods=['POST'])
@@ -208,34 +345,113 @@ def start_bulk_scrape():
     platform = request.form.get('platform')
     url_text = request.form.get('urls')
     job_id = str(uuid.uuid4())
-    JOBS[job_id] = {"status": "Queued", "done": False}
+    JOBS.create(job_id, status="Queued", done=False)
     
     scraper = get_scraper(platform, job_id)
     if scraper:
-        threading.Thread(target=run_async_job, args=(scraper.run_bulk, url_text)).start()
-        return jsonify({"job_id": job_id})
+        CHECKPOINTS.start_job(job_id, platform, url_text)
+        if BROKER: return enqueue_shards(job_id, scraper, url_text, bulk_priority(url_text))
+        return enqueue(job_id, scraper.run_bulk, url_text, bulk_priority(url_text))
     return jsonify({"error": "Invalid Platform"}), 400
 
+@app.route('/resume/<job_id>', methods=['POST'])
+def resume_bulk_scrape(job_id):
+    """Restarts a crashed or interrupted bulk job. URLs it already finished are not fetched again."""
+    saved = CHECKPOINTS.job(job_id)
+    if not saved: return jsonify({"error": "Unknown job"}), 404
+    if not JOBS.get(job_id, {"done": True}).get('done'): return jsonify({"error": "Job is still running"}), 409
+    platform, url_text = saved
+    JOBS.create(job_id, status=f"Queued (resuming, {CHECKPOINTS.count(job_id)} rows saved)", done=False)
+    if BROKER: return enqueue_shards(job_id, get_scraper(platform, job_id), url_text, bulk_priority(url_text)) # Shards resume from their own checkpoints
+    return enqueue(job_id, get_scraper(platform, job_id).run_bulk, url_text, bulk_priority(url_text))
+
 @app.route('/start_review_scrape', methods=['POST'])
 def start_review_scrape():
     platform = request.form.get('platform')
     url = request.form.get('url')
     job_id = str(uuid.uuid4())
-    JOBS[job_id] = {"status": "Queued", "done": False}
+    JOBS.create(job_id, status="Queued", done=False)
     
     scraper = get_scraper(platform, job_id)
     if scraper:
-        threading.Thread(target=run_async_job, args=(scraper.run_reviews, url)).start()
-        return jsonify({"job_id": job_id})
+        scraper.since_last_run = request.form.get('since_last_run') == '1'
+        return enqueue(job_id, scraper.run_reviews, url, PRIORITY_REVIEWS)
     return jsonify({"error": "Invalid Platform"}), 400
 
 @app.route('/status/<job_id>')
 def status(job_id):
     return jsonify(JOBS.get(job_id, {"status": "Unknown", "done": True}))
 
-@app.route('/download/<filename>')
-def download(filename):
-    return send_file(filename, as_attachment=True)
+@app.route('/status/<job_id>/debug')
+def debug_bundle(job_id):
+    """The job's debug zip: summary, per-URL timeline, failures, sampled stacks and slowest-page traces."""
+    path = JOBS.get(job_id, {}).get('debug_file')
+    if not path or not os.path.exists(path): return jsonify({"error": "No debug profile for this job"}), 404
+    return send_file(path, as_attachment=True)
+
+@app.route('/events/<job_id>')
+def events(job_id):
+    """Server-Sent Events stream of the job's status record, sent only when it changes. Ends when the
+    job is done. Streams are capped at SSE_MAX_SECONDS and the browser reconnects on its own. Past
+    SSE_MAX_STREAMS open streams this returns 503 and the page falls back to polling /status."""
+    if not SSE_SLOTS.acquire(blocking=False):
+        return jsonify({"error": "Too many open event streams, poll /status instead"}), 503
+
+    def stream():
+        yield "retry: 2000\n\n"
+        since, last = 0, None
+        deadline = time.monotonic() + SSE_MAX_SECONDS
+        while time.monotonic() < deadline:
+            changed = JOBS.wait_for_change(job_id, since, timeout=15)
+            if changed is None:
+                yield ": keepalive\n\n" # Stops proxies from closing an idle stream
+                continue
+            record, since = changed
+            record = record or {"status": "Unknown", "done": True}
+            payload = json.dumps(record)
+            if payload != last: yield f"data: {payload}\n\n"
+            last = payload
+            if record.get('done'): return
+
+    response = Response(stream(), mimetype='text/event-stream', headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+    response.call_on_close(SSE_SLOTS.release) # Also runs when the client goes away before the stream starts
+    return response
+
+@app.route('/pool')
+def pool_stats():
+    if BROKER: return jsonify({"mode": "broker", "broker": BROKER.stats(), "jobs": JOBS.stats()})
+    return jsonify({**WORKERS.stats(), "scheduler": SCHEDULER.stats(), "jobs": JOBS.stats()})
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus text exposition: counters and histograms summed over every process writing to METRICS_DIR
+    (web workers, process-mode children, broker nodes), plus this process's gauges."""
+    return Response(REGISTRY.render(), mimetype="text/plain; version=0.0.4")
+
+@app.route('/fetch_stats')
+def fetch_stats():
+    return jsonify(FETCH_STATS.snapshot())
+
+@app.route('/rate_limits')
+def rate_limits():
+    return jsonify(RATE_LIMITER.stats())
+
+@app.route('/cache')
+def cache_stats():
+    return jsonify(DETAIL_CACHE.stats())
+
+@app.route('/download/<name>')
+def download(name):
+    """Serves a job's output by job ID, or an output file in OUTPUT_DIR by name. With ?partial=1 a running
+    job serves the rows streamed so far, with ?file=merged an incremental review job its full history."""
+    job = JOBS.get(name)
+    if job is None: return send_from_directory(OUTPUT_DIR, name, as_attachment=True)
+    if request.args.get('file') == 'merged' and job.get('merged_file'): return send_file(job['merged_file'], as_attachment=True)
+    if job.get('filename') and job.get('done'): return send_file(job['filename'], as_attachment=True)
+    path = job.get('partial_file')
+    if request.args.get('partial') != '1' or not path or not os.path.exists(path):
+        return jsonify({"error": "No output yet"}), 404
+    return send_file(io.BytesIO(read_partial(path)), mimetype='text/csv', as_attachment=True, download_name=os.path.basename(path))
 
 if __name__ == '__main__':
     app.run(debug=True, port=5000)
\ No newline at end of file
@@ -1,151 +1,119 @@
-import asyncio
+import os
 import random
 import re
 import urllib.parse
 from datetime import datetime
-import pandas as pd
-from playwright.async_api import async_playwright
+from scrapers.base import BaseScraper
+from scrapers.canonical import amazon_asin
+from scrapers.concurrency import bounded_gather
+from scrapers.extractors import extract_cards
+from scrapers import html_extract
+from scrapers.review_store import REVIEW_STORE
 from playwright_stealth import Stealth
 
-class AmazonScraper:
-    def __init__(self, job_id, jobs_dict):
-        self.job_id = job_id
-        self.jobs = jobs_dict # Reference to global JOBS dict to update status
+REVIEW_SELECTOR = "div[data-hook='review']"
+REVIEW_STARS = ("five_star", "four_star", "three_star", "two_star", "one_star")
+REVIEW_PAGE_CAP = 10 # Amazon stops paging a review listing after 10 pages of 10
 
-    def update_status(self, status, progress=None, total=None, done=False, filename=None):
-        self.jobs[self.job_id]['status'] = status
-        if progress: self.jobs[self.job_id]['progress'] = progress
-        if total: self.jobs[self.job_id]['total'] = total
-        if done: self.jobs[self.job_id]['done'] = True
-        if filename: self.jobs[self.job_id]['filename'] = filename
+class AmazonScraper(BaseScraper):
+    PLATFORM = "amazon"
+    REVIEW_SORT = "recent"
+    REVIEW_CONCURRENCY = 4 # Review pages loaded in parallel tabs, override with AMAZON_REVIEW_CONCURRENCY
+
+    def __init__(self, job_id, jobs):
+        super().__init__(job_id, jobs)
+        self.review_concurrency = int(os.environ.get("AMAZON_REVIEW_CONCURRENCY", self.REVIEW_CONCURRENCY))
+        self.since_last_run = False # Only fetch reviews newer than the ones stored for this ASIN
 
     async def simulate_human_behavior(self, page):
         for _ in range(3):
             await page.mouse.move(random.randint(100, 1000), random.randint(100, 800), steps=10)
-            await asyncio.sleep(0.2)
+            await self.pause(0.2)
         await page.evaluate("window.scrollTo(0, document.body.scrollHeight/2)")
-        await asyncio.sleep(0.5)
+        await self.pause(0.5)
         await page.evaluate("window.scrollTo(0, 0)")
 
     def extract_asin(self, url):
-        match = re.search(r"/(?:dp|gp/product)/([A-Z0-9]{10})", url)
-        return match.group(1) if match else "N/A"
+        return amazon_asin(url) or "N/A"
 
     async def get_deep_details(self, context, item_data):
         url = item_data['URL']
         asin = self.extract_asin(url)
-        page = await context.new_page()
+        if asin == "N/A": asin = item_data.get('ASIN') or "N/A" # Sponsored links hide the ASIN in a redirect
         try:
-            await page.goto(url, wait_until="domcontentloaded", timeout=60000)
-            
-            title_el = await page.query_selector("#productTitle")
-            title = await title_el.inner_text() if title_el else "N/A"
-            
-            price_el = await page.query_selector(".a-price-whole")
-            price = (await price_el.inner_text()).replace(",", "").strip().rstrip('.') if price_el else "N/A"
-
-            rating_el = await page.query_selector("span.a-icon-alt")
-            rating = (await rating_el.inner_text()).split()[0] if rating_el else "N/A"
-            
-            reviews_el = await page.query_selector("#acrCustomerReviewText")
-            reviews = "".join(filter(str.isdigit, await reviews_el.inner_text())) if reviews_el else "0"
-
-            bought_el = await page.query_selector("#social-proofing-faceout-title-text span")
-            if not bought_el: bought_el = await page.query_selector(".social-proofing-faceout-title-text span")
-            bought_count = await bought_el.inner_text() if bought_el else "N/A"
-
-            full_text = await page.inner_text("body")
-            rank_matches = re.findall(r"#(\d+[\d,]*)\s+in\s+([A-Za-z\s&,\-]+)", full_text)
-            
-            def clean_cat(text): return text.split("Feedback")[0].split("Would you like")[0].strip()
-            prim_rank_num, prim_rank_cat = "N/A", "N/A"
-            sec_rank_num, sec_rank_cat = "N/A", "N/A"
-            if len(rank_matches) > 0:
-                prim_rank_num, prim_rank_cat = f"#{rank_matches[0][0]}", clean_cat(rank_matches[0][1])
-            if len(rank_matches) > 1:
-                sec_rank_num, sec_rank_cat = f"#{rank_matches[1][0]}", clean_cat(rank_matches[1][1])
-
-            await page.close()
-            return {
-                "Product Name": title.strip(), "Price (INR)": price, "Rating": rating, 
-                "Number of Ratings": reviews, "ASIN": asin,
-                "Primary Rank Number": prim_rank_num, "Primary Rank Category": prim_rank_cat,
-                "Secondary Rank Number": sec_rank_num, "Secondary Rank Category": sec_rank_cat,
+            timings = {}
+            fields = await self.fetch_fields(context, url, html_extract.amazon_product, timings, product_id=asin)
+            for step, seconds in timings.items(): self.record_timing(step, seconds)
+            if not fields: return None
+            row = {
+                "Product Name": fields["Product Name"],
+                "Price (INR)": fields["Price (INR)"] or item_data.get('Card Price') or "N/A",
+                "Rating": fields["Rating"] or item_data.get('Card Rating') or "N/A",
+                "Number of Ratings": fields["Number of Ratings"], "ASIN": asin,
+                "Primary Rank Number": fields["Primary Rank Number"], "Primary Rank Category": fields["Primary Rank Category"],
+                "Secondary Rank Number": fields["Secondary Rank Number"], "Secondary Rank Category": fields["Secondary Rank Category"],
                 "Result Type": item_data['Result Type'], 
-                "Bought in past month": bought_count,
-                "Date Scraped": item_data.get('Date Scraped', 'N/A'),
+                "Bought in past month": fields["Bought in past month"],
+                "Date Scraped": fields["Date Scraped"],
                 "URL": url
             }
-        except:
-            await page.close()
+            if 'Search Position' in item_data: row["Search Position"] = item_data['Search Position']
+            return row
+        except Exception as e:
+            self.note_failure(url, e)
             return None
 
     async def run_search(self, search_url):
         try:
-            self.update_status("Launching Browser (Visible)...")
-            async with async_playwright() as p:
-                browser = await p.chromium.launch(headless=False)
-                context = await browser.new_context(viewport={'width':1920,'height':1080}, user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
+            self.update_status("Acquiring Browser...")
+            async with self.browser_context(viewport={'width':1920,'height':1080}, user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36") as context:
                 page = await context.new_page()
                 
                 Stealth().apply_stealth_sync(page) 
                 
                 self.update_status("Visiting Home (Cookie Warmup)...")
                 await page.goto("https://www.amazon.in/", wait_until="domcontentloaded", timeout=60000)
-                await asyncio.sleep(3)
+                await self.pause(3)
 
                 self.update_status("Searching... (REFRESH IF BLOCKED!)")
+                if "amazon." not in search_url:
+                    search_url = f"https://www.amazon.in/s?k={urllib.parse.quote_plus(search_url)}"
                 await page.goto(search_url, wait_until="domcontentloaded", timeout=60000)
                 await self.simulate_human_behavior(page)
 
                 product_cards = []
                 for attempt in range(40):
-                    product_cards = await page.query_selector_all('div[data-component-type="s-search-result"]')
+                    product_cards = await extract_cards(page, self.PLATFORM)
                     if len(product_cards) > 0: break
                     self.update_status(f"Waiting... ({40-attempt}). REFRESH PAGE manually if needed!")
-                    await asyncio.sleep(5)
+                    await self.pause(5)
                 
                 if not product_cards:
                      self.update_status("Error: Timeout/No products.", done=True)
-                     await browser.close()
                      return
                 
                 self.update_status(f"Found {len(product_cards)} products. Deep Scrape...")
                 initial_data = []
                 for card in product_cards:
-                    link_el = await card.query_selector("h2 a")
-                    if not link_el: link_el = await card.query_selector("a.a-link-normal.s-no-outline")
-                    if not link_el: continue
-                    
-                    href = await link_el.get_attribute("href")
-                    t_content = await card.inner_text()
-                    r_type = "Organic"
-                    if await card.query_selector('.puis-sponsored-label-text') or "Sponsored" in t_content[:50]: r_type = "Sponsored"
-                    elif await card.query_selector('span[aria-label="Amazon\'s Choice"]') or "Amazon's Choice" in t_content: r_type = "Amazon's Choice"
-                    
                     initial_data.append({
-                        "URL": f"https://www.amazon.in{href}",
-                        "Result Type": r_type,
+                        "URL": f"https://www.amazon.in{card['href']}",
+                        "Result Type": card['result_type'],
+                        "Search Position": card['position'],
+                        "ASIN": card['asin'],
+                        "Card Price": card['price'],
+                        "Card Rating": card['rating'],
                         "Date Scraped": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
                     })
                 
-                final = []
-                for i, item in enumerate(initial_data):
-                    self.update_status(f"Processing {i+1}/{len(initial_data)}...", progress=i+1, total=len(initial_data))
-                    d = await self.get_deep_details(context, item)
-                    if d: final.append(d)
-                    await asyncio.sleep(random.uniform(2, 4))
-                
-                await browser.close()
-                
                 try:
                     parsed = urllib.parse.urlparse(search_url)
                     q = urllib.parse.parse_qs(parsed.query).get('k', ['search'])[0]
-                    fname = f"amazon_scrapped_results_{re.sub(r'[^a-zA-Z0-9]', '_', q)}.csv"
+                    fname = f"amazon_scrapped_results_{re.sub(r'[^a-zA-Z0-9]', '_', q)}_{self.job_id}.csv"
                 except: fname = f"amazon_scrapped_results_{self.job_id}.csv"
                 
-                pd.DataFrame(final).to_csv(fname, index=False, encoding='utf-8-sig')
-                self.update_status("Done!", done=True, filename=fname)
+                with self.result_writer(fname) as writer:
+                    await self.fetch_details(context, initial_data, writer)
+                self.update_status("Done!", done=True, filename=writer.fname)
         except Exception as e:
             print(f"Error: {e}")
             self.update_status(f"Error: {e}", done=True)
@@ -153,106 +121,132 @@ class AmazonScraper:
     async def run_bulk(self, url_text):
         try:
             urls = [u.strip() for u in re.split(r'[,\n ]', url_text) if u.strip()]
+            urls, inputs = self.dedupe_urls(urls)
             if not urls:
                 self.update_status("Error: No Valid URLs found.", done=True)
                 return
 
-            self.update_status("Launching Browser (Visible)...")
-            async with async_playwright() as p:
-                browser = await p.chromium.launch(headless=False)
-                context = await browser.new_context(viewport={'width':1920,'height':1080}, user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
+            self.update_status("Acquiring Browser...")
+            async with self.browser_context(viewport={'width':1920,'height':1080}, user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36") as context:
                 
-                final = []
-                for i, url in enumerate(urls):
-                    self.update_status(f"Scraping Product {i+1}/{len(urls)}...", progress=i+1, total=len(urls))
-                    
+                items = []
+                for url in urls:
                     if not url.startswith("http"): url = f"https://www.amazon.in{url}" if url.startswith("/") else f"https://{url}"
-
-                    item = {
+                    items.append({
                         "URL": url,
                         "Result Type": "Direct URL",
                         "Date Scraped": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                    }
-                    
-                    d = await self.get_deep_details(context, item)
-                    if d: final.append(d)
-                    
-                    await asyncio.sleep(random.uniform(2, 4))
+                    })
 
-                await browser.close()
-                
+                self.update_status(f"Scraping {len(items)} Products...", total=len(items))
                 fname = f"amazon_bulk_results_{self.job_id}.xlsx"
-                pd.DataFrame(final).to_excel(fname, index=False)
-                self.update_status("Done!", done=True, filename=fname)
+                with self.result_writer(fname) as writer:
+                    await self.fetch_details(context, items, writer, checkpoint=True, fan_out=inputs)
+                self.update_status("Done!", done=True, filename=writer.fname)
 
         except Exception as e:
             print(f"Bulk Error: {e}")
             self.update_status(f"Error: {e}", done=True)
 
+    def review_url(self, asin, page_num=1, star="all_stars"):
+        query = urllib.parse.urlencode({"reviewerType": "all_reviews", "pageNumber": page_num, "sortBy": self.REVIEW_SORT, "filterByStar": star})
+        return f"https://www.amazon.in/product-reviews/{asin}/?{query}"
+
+    async def review_page(self, context, asin, star, page_num):
+        html = await self.page_html(context, self.review_url(asin, page_num, star), wait_for=REVIEW_SELECTOR)
+        return await self.extract(html_extract.amazon_reviews, html), html
+
     async def run_reviews(self, product_url):
         try:
-            self.update_status("Launching Browser (Visible)...")
-            async with async_playwright() as p:
-                browser = await p.chromium.launch(headless=False)
-                context = await browser.new_context(viewport={'width':1920,'height':1080})
+            self.update_status("Acquiring Browser...")
+            async with self.browser_context(viewport={'width':1920,'height':1080}) as context:
                 page = await context.new_page()
                 Stealth().apply_stealth_sync(page)
                 
                 self.update_status("Visiting Home...")
                 await page.goto("https://www.amazon.in/", wait_until="domcontentloaded")
-                await asyncio.sleep(2)
+                await self.pause(2)
                 
                 asin = self.extract_asin(product_url)
-                review_url = f"https://www.amazon.in/product-reviews/{asin}/?reviewerType=all_reviews"
                 self.update_status("Navigating directly to Review Page...")
-                await page.goto(review_url, wait_until="domcontentloaded")
+                await page.goto(self.review_url(asin), wait_until="domcontentloaded")
 
                 # Handle login redirects check (simplified from original for brevity, but retaining core logic)
                 while "/ap/signin" in page.url:
                     self.update_status("Amazon asks for Login. PLEASE FINISH MANUALLY!")
-                    await asyncio.sleep(5)
+                    await self.pause(5)
                 
                 try:
-                    await page.wait_for_selector("div[data-hook='review']", timeout=10000)
+                    await page.wait_for_selector(REVIEW_SELECTOR, timeout=10000)
                 except:
                     pass
 
-                reviews_data = []
-                page_num = 1
-                MAX_PAGES = 50 # Cap for now
-                
-                while page_num <= MAX_PAGES:
-                    self.update_status(f"Scraping Reviews Page {page_num}...")
-                    
-                    await asyncio.sleep(2)
-                    cards = await page.query_selector_all("div[data-hook='review']")
-                    if not cards: break
-                    
-                    for card in cards:
-                        try:
-                            name = await (await card.query_selector(".a-profile-name")).inner_text()
-                            rating = (await (await card.query_selector("i[data-hook='review-star-rating'] span.a-icon-alt")).inner_text()).split()[0]
-                            date = await (await card.query_selector("span[data-hook='review-date']")).inner_text()
-                            body = await (await card.query_selector("span[data-hook='review-body']")).inner_text()
-                            
-                            reviews_data.append({
-                                "Reviewer Name": name, "Rating": rating, "Review Date": date, "Review Text": body.strip()
-                            })
-                        except: continue
-                    
-                    next_btn = await page.query_selector("li.a-last a")
-                    if next_btn:
-                        await next_btn.click()
-                        await page.wait_for_load_state("domcontentloaded")
-                        page_num += 1
+                # The signed-in session is shared by every tab of the context, so the rest is fetched in parallel
+                first_html = await page.content()
+                await page.close()
+                total = await self.extract(html_extract.amazon_review_count, first_html)
+
+                # Refreshes only walk the newest-first listing until they reach a review stored by an earlier run
+                incremental = self.since_last_run and REVIEW_STORE.count(asin) > 0
+                fname = f"amazon_reviews_{asin}_new_{self.job_id}.csv" if incremental else f"amazon_reviews_{asin}_{self.job_id}.csv"
+                seen = set()
+                pages_done = 0
+
+                def write_new(writer, reviews):
+                    """Writes reviews not written yet (only ones not stored before, when incremental).
+                    Returns True if the page held an already-stored review."""
+                    fresh = REVIEW_STORE.add(asin, reviews)
+                    for review in (fresh if incremental else reviews):
+                        if review["Review ID"] and review["Review ID"] in seen: continue
+                        seen.add(review["Review ID"])
+                        writer.write(review)
+                    return len(fresh) < len(reviews)
+
+                async def fetch(writer, star, page_numbers):
+                    async def one(page_num):
+                        nonlocal pages_done
+                        reviews, _ = await self.review_page(context, asin, star, page_num)
+                        write_new(writer, reviews)
+                        pages_done += 1
+                        self.update_status(f"Scraping review pages ({pages_done} done, {len(seen)} reviews)...")
+                    await bounded_gather(list(page_numbers), one, self.review_concurrency)
+
+                with self.result_writer(fname, "amazon_reviews") as writer:
+                    first_reviews = await self.extract(html_extract.amazon_reviews, first_html)
+                    reached_known = write_new(writer, first_reviews)
+                    if incremental:
+                        page_num, reviews = 1, first_reviews
+                        while not reached_known and len(reviews) >= 10 and page_num < REVIEW_PAGE_CAP:
+                            page_num += 1
+                            self.update_status(f"Checking review page {page_num} for new reviews ({len(seen)} so far)...")
+                            reviews, _ = await self.review_page(context, asin, "all_stars", page_num)
+                            reached_known = write_new(writer, reviews)
+                    elif total is not None and total <= REVIEW_PAGE_CAP * 10:
+                        await fetch(writer, "all_stars", range(2, min(REVIEW_PAGE_CAP, -(-total // 10)) + 1))
                     else:
-                        break
-
-                await browser.close()
-                
-                fname = f"amazon_reviews_{asin}.csv"
-                pd.DataFrame(reviews_data).to_csv(fname, index=False, encoding='utf-8-sig')
-                self.update_status("Done!", done=True, filename=fname)
+                        # One listing stops at REVIEW_PAGE_CAP pages, so bigger products are split by star rating.
+                        # Page 1 of each star listing also tells how many pages that listing has.
+                        self.update_status("Splitting reviews by star rating...")
+                        counts = {}
+                        async def first_page(star):
+                            reviews, html = await self.review_page(context, asin, star, 1)
+                            write_new(writer, reviews)
+                            counts[star] = await self.extract(html_extract.amazon_review_count, html) if reviews else 0
+                        await bounded_gather(list(REVIEW_STARS), first_page, self.review_concurrency)
+                        for star in REVIEW_STARS:
+                            last = REVIEW_PAGE_CAP if counts.get(star) is None else min(REVIEW_PAGE_CAP, -(-counts[star] // 10))
+                            await fetch(writer, star, range(2, last + 1))
+
+                if incremental:
+                    # Full history for this ASIN, new reviews first
+                    with self.result_writer(f"amazon_reviews_{asin}_{self.job_id}.csv", "amazon_reviews") as merged:
+                        merged.write_rows(REVIEW_STORE.reviews(asin))
+                    self.state['merged_file'] = merged.fname
+                    self.state['new_reviews'] = writer.count
+                    self.update_status(f"Done! {writer.count} new reviews, {merged.count} in the full history", done=True, filename=writer.fname)
+                    return
+
+                self.update_status("Done!", done=True, filename=writer.fname)
 
         except Exception as e:
             print(f"Review Error: {e}")
@@ -0,0 +1,285 @@
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager, contextmanager
+from datetime import datetime
+from scrapers.browser_pool import BrowserPool, get_pool
+from scrapers.concurrency import bounded_gather
+from scrapers.resource_policy import apply_resource_policy, apply_site_override, new_network_stats
+from scrapers.html_extract import extract
+from scrapers.http_fetch import FETCH_STATS, fetch_html
+from scrapers.detail_cache import DETAIL_CACHE
+from scrapers.checkpoints import CHECKPOINTS
+from scrapers.output import ResultWriter, output_path
+from scrapers.rate_limit import RATE_LIMITER
+from scrapers.canonical import dedupe, parse_urls
+from scrapers.metrics import BLOCKS, CACHE, FAILURES, JOBS_FINISHED, PAGES, STAGE_SECONDS
+from scrapers.profiling import CURRENT_URL, JobProfile
+
+class BaseScraper:
+    PLATFORM = None
+    DETAIL_CONCURRENCY = 3 # Product pages loaded in parallel tabs, override with <PLATFORM>_DETAIL_CONCURRENCY
+    HTTP_FIRST = False # Try a plain HTTP fetch before opening a tab (server-rendered product pages only)
+
+    def __init__(self, job_id, jobs):
+        self.job_id = job_id
+        self.jobs = jobs # Shared JobStore the job's status is published to
+        self.state = {} # This run's fields of the job record (status, progress, stats), merged into the store on save
+        self.detail_concurrency = int(os.environ.get(f"{(self.PLATFORM or '').upper()}_DETAIL_CONCURRENCY", self.DETAIL_CONCURRENCY))
+        self.max_staleness = None # Seconds; caps the detail cache TTLs for this job, 0 bypasses the cache
+        self.output_format = None # "parquet" swaps the job's CSV/XLSX output for a typed Parquet file
+        self.job_type = None # search, bulk, reviews or merge; set by whoever queues the job, labels its metrics
+        self.debug = False # Capture a JobProfile (sampled stacks, timeline, slowest-page traces) for this job
+        self.profile = None
+        self.parent_job = None # Set on a shard of a brokered bulk job: (parent job_id, shard index)
+        self.failed_shards = () # Set on a brokered merge: shard job IDs that failed for good
+
+    def update_status(self, status, progress=None, total=None, done=False, filename=None):
+        self.state['status'] = status
+        if progress: self.state['progress'] = progress
+        if total: self.state['total'] = total
+        if done and not self.state.get('done'):
+            JOBS_FINISHED.inc(platform=self.PLATFORM, job_type=self.job_type, outcome="error" if status.startswith("Error") else "ok")
+        if done and self.profile:
+            self.state['debug_file'] = self.profile.finish()
+            self.profile = None
+        if done: self.state['done'] = True
+        if filename: self.state['filename'] = filename
+        self.save_state()
+
+    def save_state(self):
+        # Stats dicts (timings, network, fetch, cache) are mutated in place and published with the next save
+        self.jobs.update(self.job_id, **self.state)
+        if self.parent_job:
+            parent, shard = self.parent_job
+            self.jobs.update_shard(parent, shard, **{k: self.state.get(k) for k in ('status', 'progress', 'total', 'done')})
+
+    def record_timing(self, key, seconds):
+        timings = self.state.setdefault('timings', {})
+        entry = timings.setdefault(key, {"count": 0, "total_ms": 0.0})
+        entry["count"] += 1
+        entry["total_ms"] = round(entry["total_ms"] + seconds * 1000, 1)
+        STAGE_SECONDS.observe(seconds, platform=self.PLATFORM, job_type=self.job_type, stage=key)
+        if self.profile: self.profile.event(key, seconds)
+
+    @contextmanager
+    def timed(self, key):
+        """Adds the wall time of the block to the job's per-stage timing breakdown."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_timing(key, time.perf_counter() - start)
+
+    async def pause(self, seconds):
+        """asyncio.sleep for the scrapers' deliberate waits, counted as sleep time in timings and metrics."""
+        with self.timed("sleep.pause"):
+            await asyncio.sleep(seconds)
+
+    async def throttle(self, url):
+        """Waits for the domain's rate limiter and records the wait."""
+        waited = await RATE_LIMITER.acquire(url)
+        if waited: self.record_timing("sleep.rate_limit", waited)
+
+    @asynccontextmanager
+    async def browser_context(self, **context_kwargs):
+        stats = self.state.setdefault('network', new_network_stats())
+        profiled = self.debug and self.profile is None
+        if profiled: self.profile = JobProfile(self.job_id)
+        pool = get_pool()
+        try:
+            if pool:
+                async with pool.context(**context_kwargs) as context, self._instrumented(context, stats):
+                    yield context
+                return
+
+            # Running outside the app (no pool on this loop): use a throwaway single-browser pool
+            pool = BrowserPool(max_browsers=1, health_interval=0)
+            try:
+                async with pool.context(**context_kwargs) as context, self._instrumented(context, stats):
+                    yield context
+            finally:
+                await pool.stop()
+        finally:
+            # A cancelled job (past its fan-out budget, lease lost) never reaches update_status(done=True)
+            if profiled and self.profile:
+                self.state['debug_file'] = self.profile.finish()
+                self.profile = None
+                self.save_state()
+
+    @asynccontextmanager
+    async def _instrumented(self, context, stats):
+        await apply_resource_policy(context, self.PLATFORM, stats)
+        await apply_site_override(context)
+        if self.profile: await context.tracing.start(snapshots=True) # Kept per page in chunks, see JobProfile.traced_load
+        try:
+            yield context
+        finally:
+            if self.profile:
+                try:
+                    await context.tracing.stop()
+                except Exception: pass
+
+    def result_writer(self, fname, kind=None):
+        """Opens a streaming writer for the job's output and exposes its partial file for downloads.
+        `kind` picks the Parquet schema and defaults to the platform."""
+        if self.output_format == "parquet": fname = os.path.splitext(fname)[0] + ".parquet"
+        writer = ResultWriter(output_path(fname), kind or self.PLATFORM, timer=self.record_timing)
+        self.state['partial_file'] = writer.partial_path
+        self.save_state()
+        return writer
+
+    def dedupe_urls(self, urls):
+        """Collapses pasted URLs that point at the same product. Returns (unique_urls, inputs), where
+        inputs[i] lists every original URL behind unique_urls[i], for fetch_details(fan_out=...)."""
+        unique, inputs = dedupe(self.PLATFORM, urls)
+        self.state['dedupe'] = {"inputs": len(urls), "unique": len(unique), "ratio": round(1 - len(unique) / len(urls), 3) if urls else 0}
+        return unique, inputs
+
+    async def fetch_details(self, context, items, writer, checkpoint=False, fan_out=None):
+        """Runs get_deep_details over items in parallel tabs of one context and streams the rows to `writer`
+        in input order as soon as every earlier item has finished. Returns the number of rows written.
+        Page loads are paced per domain by RATE_LIMITER rather than fixed sleeps.
+        With checkpoint=True every finished row is saved as it lands and rows saved by an earlier run
+        of the same job are reused, so a resumed bulk job only fetches what is left.
+        With fan_out (see dedupe_urls) each row is written once per original input URL."""
+        done = CHECKPOINTS.completed(self.job_id) if checkpoint else {}
+        done = {idx: row for idx, (url, row) in done.items() if idx < len(items) and items[idx]["URL"] == url}
+        if done: self.state['resumed_rows'] = len(done)
+        finished, next_idx = dict(done), 0
+
+        def flush():
+            # Only rows still waiting on a slower earlier item are held in memory
+            nonlocal next_idx
+            while next_idx in finished:
+                row = finished.pop(next_idx)
+                if row and fan_out:
+                    for url in fan_out[next_idx]: writer.write({**row, "Input URL": url})
+                elif row: writer.write(row)
+                next_idx += 1
+
+        def progress(n, total):
+            self.update_status(f"Processing {len(done) + n}/{len(items)}...", progress=len(done) + n, total=len(items))
+
+        async def fetch(idx):
+            row = None
+            CURRENT_URL.set(items[idx]["URL"])
+            start = time.perf_counter()
+            try:
+                row = await self.get_deep_details(context, items[idx])
+                if not row: FAILURES.inc(platform=self.PLATFORM, job_type=self.job_type)
+                if checkpoint and row: CHECKPOINTS.save_row(self.job_id, idx, items[idx]["URL"], row)
+            finally:
+                if self.profile: self.profile.page_done(items[idx]["URL"], time.perf_counter() - start)
+                finished[idx] = row
+                flush()
+
+        flush()
+        await bounded_gather([idx for idx in range(len(items)) if idx not in done], fetch, self.detail_concurrency, on_done=progress)
+        return writer.count
+
+    async def run_merge(self, shard_ids):
+        """Last step of a sharded bulk job: writes the job's output from the rows its shards checkpointed,
+        in the original input order. Shard i ran run_bulk over the i-th slice of the deduped URL list."""
+        try:
+            saved = CHECKPOINTS.job(self.job_id)
+            if not saved: raise ValueError("bulk job was not checkpointed")
+            _, inputs = self.dedupe_urls(parse_urls(saved[1]))
+            self.update_status("Merging shards...")
+            fname = f"{self.PLATFORM}_bulk_{self.job_id}.xlsx"
+            with self.result_writer(fname) as writer:
+                start = 0
+                for shard_id in shard_ids.split(","):
+                    rows = CHECKPOINTS.completed(shard_id)
+                    for idx in sorted(rows):
+                        for url in inputs[start + idx]: writer.write({**rows[idx][1], "Input URL": url})
+                    start += len(parse_urls(CHECKPOINTS.job(shard_id)[1]))
+            failed = [s for s in shard_ids.split(",") if s in self.failed_shards]
+            if failed:
+                # Rows the failed shards checkpointed before failing are in; the rest of their URLs are missing
+                self.state['failed_shards'] = failed
+                self.state['partial'] = True
+                self.update_status(f"Done with missing rows: {len(failed)} of {len(shard_ids.split(','))} shards failed ({', '.join(failed)})",
+                                   done=True, filename=writer.fname)
+                return
+            self.update_status("Done!", done=True, filename=writer.fname)
+        except Exception as e:
+            self.update_status(f"Error: {e}", done=True)
+
+    async def page_html(self, context, url, wait_until="domcontentloaded", wait_for=None):
+        """Loads url in a fresh tab and returns its HTML. The tab is closed as soon as the HTML is captured.
+        With `wait_for`, the HTML is captured once that selector shows up (or after 10s, for empty pages)."""
+        await self.throttle(url)
+        CURRENT_URL.set(url)
+
+        async def load():
+            page = await context.new_page()
+            try:
+                with self.timed("navigation"):
+                    response = await page.goto(url, wait_until=wait_until, timeout=60000)
+                if wait_for:
+                    with self.timed("selector_wait"):
+                        try:
+                            await page.wait_for_selector(wait_for, timeout=10000)
+                        except Exception: pass
+                html = await page.content()
+                self.count_page("browser", RATE_LIMITER.record(url, response.status if response else 200, page.url, html))
+                return html
+            finally:
+                await page.close()
+
+        return await (self.profile.traced_load(context, url, load) if self.profile else load())
+
+    async def fetch_fields(self, context, url, parser, *args, wait_until="domcontentloaded", required=(), product_id=None):
+        """Parses a product page with `parser`. Fresh cached fields for `product_id` skip the load entirely.
+        Goes over HTTP first when HTTP_FIRST is set and falls back to a browser tab if the response is
+        blocked, empty or missing any of the `required` fields. The fields carry "Date Scraped": when the
+        page was loaded, which for a cache hit is the original fetch."""
+        cache = self.state.setdefault('cache', {"hits": 0, "misses": 0})
+        if product_id and self.max_staleness != 0:
+            cached = DETAIL_CACHE.get(self.PLATFORM, product_id, self.max_staleness)
+            cache["hits" if cached else "misses"] += 1
+            CACHE.inc(platform=self.PLATFORM, job_type=self.job_type, result="hit" if cached else "miss")
+            if cached: return {**cached[0], "Date Scraped": datetime.fromtimestamp(cached[1]).strftime("%Y-%m-%d %H:%M:%S")}
+
+        fields = await self._load_fields(context, url, parser, *args, wait_until=wait_until, required=required)
+        if product_id: fields = DETAIL_CACHE.refresh(self.PLATFORM, product_id, fields, self.max_staleness)
+        return {**fields, "Date Scraped": datetime.now().strftime("%Y-%m-%d %H:%M:%S")} if fields else fields
+
+    async def _load_fields(self, context, url, parser, *args, wait_until="domcontentloaded", required=()):
+        counts = self.state.setdefault('fetch', {"fast": 0, "fallback": 0})
+        if self.HTTP_FIRST and os.environ.get("HTTP_FIRST", "1") != "0":
+            await self.throttle(url)
+            start = time.perf_counter()
+            try:
+                with self.timed("http_fetch"):
+                    status, html, final_url = await fetch_html(url)
+                blocked = RATE_LIMITER.record(url, status, final_url, html)
+                self.count_page("http", blocked)
+                fields = await self.extract(parser, html, *args) if status == 200 and not blocked else None
+            except Exception:
+                fields = None
+            if fields and all(fields.get(k) not in (None, "", "N/A") for k in required):
+                counts["fast"] += 1
+                FETCH_STATS.record(self.PLATFORM, "fast", time.perf_counter() - start)
+                return fields
+
+        start = time.perf_counter()
+        html = await self.page_html(context, url, wait_until)
+        fields = await self.extract(parser, html, *args)
+        counts["fallback"] += 1
+        FETCH_STATS.record(self.PLATFORM, "fallback", time.perf_counter() - start)
+        return fields
+
+    async def extract(self, parser, html, *args):
+        """html_extract parser run off the event loop, timed per parser."""
+        with self.timed(f"extract.{parser.__name__}"):
+            return await extract(self.profile.sampler.sampled(parser) if self.profile else parser, html, *args)
+
+    def note_failure(self, url, error):
+        """Keeps the exception behind a product that produced no row for the job's debug bundle."""
+        if self.profile: self.profile.failure(url, error)
+
+    def count_page(self, path, blocked):
+        PAGES.inc(platform=self.PLATFORM, job_type=self.job_type, path=path)
+        if blocked: BLOCKS.inc(platform=self.PLATFORM, job_type=self.job_type)
@@ -0,0 +1,134 @@
+import json
+import os
+import time
+import uuid
+from scrapers.sqlite_store import SQLiteStore
+
+class Broker(SQLiteStore):
+    """Work queue in a SQLite file that web processes and worker node processes on the same host use
+    to hand out jobs. Workers lease one item at a time and must heartbeat before the visibility timeout
+    runs out; an item whose lease expires goes back to the queue (up to `max_attempts` leases).
+
+    A sharded bulk job is a group: one item per shard plus a merge item that only becomes runnable once
+    every shard item has finished or failed. Items that fail for good are written into `jobs` (a JobStore),
+    so their records, and a shard's parent, stop showing as running."""
+    AUTOCOMMIT = True
+    def __init__(self, path, visibility_timeout=120, max_attempts=3, retention=86400, jobs=None):
+        super().__init__(path)
+        self.jobs = jobs
+        self.retention = retention # Seconds finished items are kept around for stats
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        with self._conn() as conn:
+            conn.execute("""CREATE TABLE IF NOT EXISTS work (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, job_id TEXT NOT NULL, group_id TEXT, kind TEXT NOT NULL,
+                platform TEXT NOT NULL, method TEXT NOT NULL, arg TEXT, attrs TEXT NOT NULL, priority INTEGER NOT NULL,
+                state TEXT NOT NULL, owner TEXT, lease_expires REAL, attempts INTEGER NOT NULL DEFAULT 0,
+                error TEXT, created_at REAL NOT NULL, finished_at REAL)""")
+            conn.execute("CREATE INDEX IF NOT EXISTS work_ready ON work (state, priority, id)")
+
+    def _transaction(self, fn):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = fn(conn)
+            conn.execute("COMMIT")
+            return result
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _insert(self, conn, job_id, platform, method, arg, attrs, priority, kind="job", group_id=None, state="queued"):
+        conn.execute("INSERT INTO work (job_id, group_id, kind, platform, method, arg, attrs, priority, state, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                     (job_id, group_id, kind, platform, method, arg, json.dumps(attrs), priority, state, time.time()))
+
+    def enqueue(self, job_id, platform, method, arg, attrs=None, priority=0):
+        self.purge()
+        self._transaction(lambda conn: self._insert(conn, job_id, platform, method, arg, attrs or {}, priority))
+
+    def enqueue_shards(self, job_id, platform, shards, merge_arg, attrs=None, priority=0):
+        """`shards` is a list of (shard_job_id, url_text). Each shard runs `run_bulk(url_text)` with its
+        scraper's parent_job set, and the merge item runs `run_merge(merge_arg)` under job_id once all
+        shards are done."""
+        self.purge()
+        def insert(conn):
+            for n, (shard_id, url_text) in enumerate(shards):
+                self._insert(conn, shard_id, platform, "run_bulk", url_text, {**(attrs or {}), "parent_job": [job_id, n]}, priority, kind="shard", group_id=job_id)
+            self._insert(conn, job_id, platform, "run_merge", merge_arg, attrs or {}, priority, kind="merge", group_id=job_id, state="waiting")
+        self._transaction(insert)
+
+    def lease(self, owner):
+        """Claims the next runnable item (queued, or leased with an expired lease). Returns it as a dict or None."""
+        failed = []
+        def claim(conn):
+            now = time.time()
+            # Items that ran out of attempts are failed instead of handed out again
+            expired = "state='leased' AND lease_expires < ? AND attempts >= ?"
+            failed.extend(conn.execute(f"SELECT job_id, kind, attrs, 'lease expired too many times' FROM work WHERE {expired}",
+                                       (now, self.max_attempts)).fetchall())
+            conn.execute(f"UPDATE work SET state='failed', error='lease expired too many times', finished_at=? WHERE {expired}",
+                         (now, now, self.max_attempts))
+            self._release_merges(conn)
+            row = conn.execute("""SELECT id, job_id, group_id, kind, platform, method, arg, attrs, attempts FROM work
+                WHERE state='queued' OR (state='leased' AND lease_expires < ?) ORDER BY priority, id LIMIT 1""", (now,)).fetchone()
+            if row is None: return None
+            conn.execute("UPDATE work SET state='leased', owner=?, lease_expires=?, attempts=attempts+1 WHERE id=?",
+                         (owner, now + self.visibility_timeout, row[0]))
+            keys = ("id", "job_id", "group_id", "kind", "platform", "method", "arg", "attrs", "attempts")
+            item = dict(zip(keys, row))
+            item["attrs"] = json.loads(item["attrs"])
+            item["attempts"] += 1
+            return item
+        item = self._transaction(claim)
+        self._report(failed)
+        return item
+
+    def heartbeat(self, item_id, owner):
+        """Extends the lease. Returns False if the item was taken over by another worker meanwhile."""
+        cur = self._conn().execute("UPDATE work SET lease_expires=? WHERE id=? AND owner=? AND state='leased'",
+                                   (time.time() + self.visibility_timeout, item_id, owner))
+        return cur.rowcount == 1
+
+    def complete(self, item_id, owner, error=None):
+        def finish(conn):
+            cur = conn.execute("UPDATE work SET state=?, error=?, finished_at=? WHERE id=? AND owner=?",
+                               ("failed" if error else "done", error, time.time(), item_id, owner))
+            self._release_merges(conn)
+            return conn.execute("SELECT job_id, kind, attrs, error FROM work WHERE id=?", (item_id,)).fetchall() if error and cur.rowcount else []
+        self._report(self._transaction(finish))
+
+    def _release_merges(self, conn):
+        # Failed shards don't hold the merge back; it writes what the others produced and says which are missing
+        conn.execute("""UPDATE work SET state='queued' WHERE kind='merge' AND state='waiting' AND NOT EXISTS (
+            SELECT 1 FROM work AS shard WHERE shard.group_id=work.group_id AND shard.kind='shard' AND shard.state IN ('queued', 'leased'))""")
+
+    def failed_shards(self, group_id):
+        return [row[0] for row in self._conn().execute("SELECT job_id FROM work WHERE group_id=? AND kind='shard' AND state='failed'", (group_id,))]
+
+    def _report(self, failed):
+        """Marks the job records of items that failed for good as finished with an error."""
+        if self.jobs is None: return
+        for job_id, kind, attrs, error in failed:
+            status = f"Error: {error}"
+            self.jobs.update(job_id, status=status, done=True)
+            parent = json.loads(attrs).get("parent_job")
+            if kind == "shard" and parent: self.jobs.update_shard(parent[0], parent[1], status=status, done=True, failed=True)
+
+    def purge(self):
+        self._conn().execute("DELETE FROM work WHERE state IN ('done', 'failed') AND finished_at < ?", (time.time() - self.retention,))
+
+    def stats(self):
+        rows = self._conn().execute("SELECT state, COUNT(*) FROM work GROUP BY state").fetchall()
+        owners = self._conn().execute("SELECT COUNT(DISTINCT owner) FROM work WHERE state='leased' AND lease_expires > ?", (time.time(),)).fetchone()[0]
+        return {"items": dict(rows), "active_workers": owners, "visibility_timeout": self.visibility_timeout}
+
+def new_owner_id():
+    return f"{os.uname().nodename}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+def broker_from_env(jobs=None):
+    return Broker(
+        os.environ.get("BROKER_PATH", "broker.db"),
+        visibility_timeout=float(os.environ.get("BROKER_VISIBILITY_TIMEOUT", 120)),
+        max_attempts=int(os.environ.get("BROKER_MAX_ATTEMPTS", 3)),
+        jobs=jobs,
+    )
@@ -0,0 +1,183 @@
+import asyncio
+import os
+import threading
+from contextlib import asynccontextmanager
+from playwright.async_api import async_playwright
+from scrapers.http_fetch import aclose_client
+
+# One pool per event loop. Playwright objects are bound to the loop that created them,
+# so scrapers look up the pool of the loop they are running on.
+_POOLS = {}
+
+def register_pool(loop, pool):
+    _POOLS[loop] = pool
+
+def get_pool():
+    try:
+        return _POOLS.get(asyncio.get_running_loop())
+    except RuntimeError:
+        return None
+
+class _PooledBrowser:
+    def __init__(self, browser):
+        self.browser = browser
+        self.active = 0   # contexts currently handed out
+        self.served = 0   # contexts handed out over the browser's lifetime
+        self.retiring = False
+
+    def usable(self):
+        return not self.retiring and self.browser.is_connected()
+
+class BrowserPool:
+    def __init__(self, max_browsers=2, contexts_per_browser=4, recycle_after=50, headless=False, health_interval=30):
+        self.max_browsers = max_browsers
+        self.contexts_per_browser = contexts_per_browser
+        self.recycle_after = recycle_after
+        self.headless = headless
+        self.health_interval = health_interval
+        self.playwright = None
+        self.browsers = []
+        self.launched = 0
+        self._cond = None
+        self._health_task = None
+
+    async def start(self):
+        if self.playwright: return
+        self._cond = asyncio.Condition()
+        self.playwright = await async_playwright().start()
+        if self.health_interval:
+            self._health_task = asyncio.create_task(self._health_loop())
+
+    async def stop(self):
+        if self._health_task: self._health_task.cancel()
+        for slot in list(self.browsers):
+            await self._close(slot)
+        if self.playwright:
+            await self.playwright.stop()
+            self.playwright = None
+
+    async def _close(self, slot):
+        if slot in self.browsers: self.browsers.remove(slot)
+        try:
+            await slot.browser.close()
+        except Exception: pass
+
+    async def _acquire(self):
+        async with self._cond:
+            while True:
+                # Drop browsers that crashed or were disconnected
+                for slot in [b for b in self.browsers if not b.browser.is_connected()]:
+                    await self._close(slot)
+
+                slot = next((b for b in self.browsers if b.usable() and b.active < self.contexts_per_browser), None)
+                if slot is None and len(self.browsers) < self.max_browsers:
+                    slot = _PooledBrowser(await self.playwright.chromium.launch(headless=self.headless))
+                    self.browsers.append(slot)
+                    self.launched += 1
+
+                if slot:
+                    slot.active += 1
+                    slot.served += 1
+                    if slot.served >= self.recycle_after: slot.retiring = True
+                    return slot
+                await self._cond.wait()
+
+    async def _release(self, slot):
+        async with self._cond:
+            slot.active -= 1
+            if slot.active == 0 and not slot.usable():
+                await self._close(slot)
+            self._cond.notify_all()
+
+    @asynccontextmanager
+    async def context(self, **context_kwargs):
+        """Hands out an isolated BrowserContext on a pooled browser."""
+        await self.start()
+        slot = await self._acquire()
+        context = None
+        try:
+            try:
+                context = await slot.browser.new_context(**context_kwargs)
+            except Exception:
+                slot.retiring = True # Browser is unhealthy, replace it
+                raise
+            yield context
+        finally:
+            if context:
+                try:
+                    await context.close()
+                except Exception: pass
+            await self._release(slot)
+
+    async def health_check(self):
+        async with self._cond:
+            for slot in list(self.browsers):
+                if slot.active: continue
+                try:
+                    probe = await asyncio.wait_for(slot.browser.new_context(), timeout=10)
+                    await probe.close()
+                except Exception:
+                    await self._close(slot)
+            self._cond.notify_all()
+
+    async def _health_loop(self):
+        while True:
+            await asyncio.sleep(self.health_interval)
+            try:
+                await self.health_check()
+            except Exception as e:
+                print(f"Browser pool health check failed: {e}")
+
+    def stats(self):
+        return {
+            "browsers": len(self.browsers),
+            "active_contexts": sum(b.active for b in self.browsers),
+            "contexts_served": sum(b.served for b in self.browsers),
+            "browsers_launched": self.launched,
+        }
+
+def pool_from_env():
+    """BrowserPool sized by MAX_BROWSERS, CONTEXTS_PER_BROWSER, BROWSER_RECYCLE_AFTER and HEADLESS."""
+    return BrowserPool(
+        max_browsers=int(os.environ.get("MAX_BROWSERS", 2)),
+        contexts_per_browser=int(os.environ.get("CONTEXTS_PER_BROWSER", 4)),
+        recycle_after=int(os.environ.get("BROWSER_RECYCLE_AFTER", 50)),
+        headless=os.environ.get("HEADLESS", "0") == "1",
+    )
+
+class PoolThread:
+    """Runs a BrowserPool on its own long-lived event loop in a daemon thread."""
+    def __init__(self, pool, name="browser-pool"):
+        self.pool = pool
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._run, name=name, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        register_pool(self.loop, self.pool)
+        self.loop.run_forever()
+
+    def submit(self, coro):
+        """Thread-safe: schedules a coroutine on the pool's loop and returns a concurrent Future."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro):
+        """Runs a coroutine on the pool's loop and blocks until it finishes."""
+        return self.submit(coro).result()
+
+    def stop(self, timeout=30):
+        """Closes the pool's browsers and the loop's HTTP client, then ends the loop."""
+        async def shutdown():
+            try:
+                await self.pool.stop()
+            finally:
+                await aclose_client()
+        try:
+            self.submit(shutdown()).result(timeout)
+        finally:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join(timeout)
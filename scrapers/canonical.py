@@ -0,0 +1,63 @@
+# Canonical product keys for pasted URLs, so the same product pasted with different tracking
+# params, slugs or ref= tags is only scraped once.
+import re
+import urllib.parse
+
+HOMES = {
+    "amazon": "https://www.amazon.in",
+    "flipkart": "https://www.flipkart.com",
+    "zepto": "https://zeptonow.com",
+    "jiomart": "https://www.jiomart.com",
+    "blinkit": "https://blinkit.com",
+    "swiggy": "https://www.swiggy.com",
+    "bigbasket": "https://www.bigbasket.com",
+}
+
+def absolute(platform, url):
+    if url.startswith("http"): return url
+    if url.startswith("/"): return f"{HOMES.get(platform, '')}{url}"
+    return f"https://{url}"
+
+def amazon_asin(url):
+    match = re.search(r"/(?:dp|gp/product|gp/aw/d)/([A-Z0-9]{10})", url)
+    if not match: match = re.search(r"%2F(?:dp|gp%2Fproduct)%2F([A-Z0-9]{10})", url) # Sponsored redirect links
+    return match.group(1) if match else None
+
+def flipkart_pid(url):
+    pid = urllib.parse.parse_qs(urllib.parse.urlsplit(url).query).get("pid")
+    if pid: return pid[0]
+    match = re.search(r"pid=([A-Z0-9]+)", url)
+    return match.group(1) if match else None
+
+def last_segment(url):
+    """Zepto PVIDs and Jiomart product IDs are the last path segment."""
+    segments = [s for s in urllib.parse.urlsplit(url).path.split("/") if s]
+    return segments[-1] if segments else None
+
+PRODUCT_IDS = {"amazon": amazon_asin, "flipkart": flipkart_pid, "zepto": last_segment, "jiomart": last_segment}
+
+def normalized_url(url):
+    """Scheme/host case, www., query string, fragment and trailing slash don't identify a product page."""
+    parts = urllib.parse.urlsplit(url)
+    host = (parts.hostname or "").removeprefix("www.")
+    return f"{host}{parts.path.rstrip('/')}"
+
+def product_id(platform, url):
+    extract = PRODUCT_IDS.get(platform)
+    return extract(url) if extract else None
+
+def canonical_key(platform, url):
+    pid = product_id(platform, url)
+    return f"{platform}:{pid}" if pid else normalized_url(url)
+
+def parse_urls(url_text):
+    """Splits a pasted bulk list the way the scrapers' run_bulk does."""
+    return [u.strip() for u in re.split(r'[,\n ]', url_text or "") if u.strip()]
+
+def dedupe(platform, urls):
+    """Returns (unique_urls, inputs): the first URL seen for each product, and for each of those every
+    input URL that resolved to it, in input order."""
+    groups = {}
+    for url in urls:
+        groups.setdefault(canonical_key(platform, absolute(platform, url)), []).append(url)
+    return [absolute(platform, inputs[0]) for inputs in groups.values()], list(groups.values())
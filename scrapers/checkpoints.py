@@ -0,0 +1,48 @@
+import json
+import os
+import time
+from scrapers.sqlite_store import SQLiteStore
+
+class CheckpointStore(SQLiteStore):
+    """Durable record of bulk jobs and every row they have finished, so a crashed job can be resumed by ID."""
+    def __init__(self, path, ttl_days=7):
+        super().__init__(path)
+        self.ttl = ttl_days * 86400
+        with self._conn() as conn:
+            conn.execute("""CREATE TABLE IF NOT EXISTS bulk_jobs (
+                job_id TEXT PRIMARY KEY, platform TEXT NOT NULL, url_text TEXT NOT NULL, created_at REAL NOT NULL)""")
+            conn.execute("""CREATE TABLE IF NOT EXISTS bulk_rows (
+                job_id TEXT NOT NULL, idx INTEGER NOT NULL, url TEXT NOT NULL, row TEXT NOT NULL,
+                PRIMARY KEY (job_id, idx))""")
+
+    def start_job(self, job_id, platform, url_text):
+        with self._conn() as conn:
+            conn.execute("INSERT OR IGNORE INTO bulk_jobs VALUES (?, ?, ?, ?)", (job_id, platform, url_text, time.time()))
+        self.purge()
+
+    def job(self, job_id):
+        """Returns (platform, url_text) for a checkpointed job, or None."""
+        return self._conn().execute("SELECT platform, url_text FROM bulk_jobs WHERE job_id=?", (job_id,)).fetchone()
+
+    def save_row(self, job_id, idx, url, row):
+        with self._conn() as conn:
+            conn.execute("INSERT OR REPLACE INTO bulk_rows VALUES (?, ?, ?, ?)", (job_id, idx, url, json.dumps(row, default=str)))
+
+    def completed(self, job_id):
+        """Returns {idx: (url, row)} for every row the job has already finished."""
+        rows = self._conn().execute("SELECT idx, url, row FROM bulk_rows WHERE job_id=?", (job_id,))
+        return {idx: (url, json.loads(row)) for idx, url, row in rows}
+
+    def count(self, job_id):
+        return self._conn().execute("SELECT COUNT(*) FROM bulk_rows WHERE job_id=?", (job_id,)).fetchone()[0]
+
+    def purge(self):
+        cutoff = time.time() - self.ttl
+        with self._conn() as conn:
+            conn.execute("DELETE FROM bulk_rows WHERE job_id IN (SELECT job_id FROM bulk_jobs WHERE created_at < ?)", (cutoff,))
+            conn.execute("DELETE FROM bulk_jobs WHERE created_at < ?", (cutoff,))
+
+CHECKPOINTS = CheckpointStore(
+    os.environ.get("CHECKPOINT_PATH", "checkpoints.db"),
+    ttl_days=float(os.environ.get("CHECKPOINT_TTL_DAYS", 7)),
+)
@@ -0,0 +1,20 @@
+import asyncio
+
+async def bounded_gather(items, fetch, limit=4, on_done=None):
+    """Runs fetch(item) for every item with at most `limit` in flight. Results keep input order."""
+    sem = asyncio.Semaphore(max(1, limit))
+    results = [None] * len(items)
+    finished = 0
+
+    async def worker(i, item):
+        nonlocal finished
+        async with sem:
+            try:
+                results[i] = await fetch(item)
+            except Exception as e:
+                print(f"Error fetching {item}: {e}")
+            finished += 1
+            if on_done: on_done(finished, len(items))
+
+    await asyncio.gather(*(worker(i, item) for i, item in enumerate(items)))
+    return results
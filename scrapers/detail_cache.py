@@ -0,0 +1,124 @@
+import json
+import os
+import threading
+import time
+from scrapers.sqlite_store import SQLiteStore
+
+HOUR = 3600
+DAY = 24 * HOUR
+
+# Prices move fast, names and categories hardly ever
+FIELD_TTLS = {
+    "Price (INR)": int(os.environ.get("CACHE_PRICE_TTL", 6 * HOUR)),
+    "Price": int(os.environ.get("CACHE_PRICE_TTL", 6 * HOUR)),
+    "Bought in past month": DAY,
+    "Rating": DAY,
+    "Number of Ratings": DAY,
+    "Number of Reviews": DAY,
+    "Primary Rank Number": DAY,
+    "Secondary Rank Number": DAY,
+    "Product Name": 7 * DAY,
+    "Primary Rank Category": 7 * DAY,
+    "Secondary Rank Category": 7 * DAY,
+}
+DEFAULT_TTL = DAY
+
+def _missing(value):
+    return value in (None, "", "N/A")
+
+class DetailCache(SQLiteStore):
+    """SQLite-backed cache of parsed product-page fields keyed by platform + product ID, with LRU eviction.
+    Each field keeps the time it was fetched, so a long-TTL field outlives the page load that refreshes a short-TTL one."""
+    def __init__(self, path, max_entries=50000):
+        super().__init__(path)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        with self._conn() as conn:
+            conn.execute("""CREATE TABLE IF NOT EXISTS details (
+                platform TEXT NOT NULL, product_id TEXT NOT NULL, fields TEXT NOT NULL,
+                fetched_at REAL NOT NULL, last_access REAL NOT NULL, field_times TEXT,
+                PRIMARY KEY (platform, product_id))""")
+            conn.execute("CREATE INDEX IF NOT EXISTS details_lru ON details (last_access)")
+            if "field_times" not in [row[1] for row in conn.execute("PRAGMA table_info(details)")]:
+                conn.execute("ALTER TABLE details ADD COLUMN field_times TEXT") # Older caches: every field dates from fetched_at
+
+    @staticmethod
+    def fresh_fields(fields, times, now, max_staleness=None):
+        """The fields still within their own TTL, as {field: (value, fetched_at)}."""
+        fresh = {}
+        for field, value in fields.items():
+            ttl = FIELD_TTLS.get(field, DEFAULT_TTL)
+            if max_staleness is not None: ttl = min(ttl, max_staleness)
+            if now - times[field] <= ttl: fresh[field] = (value, times[field])
+        return fresh
+
+    def _entry(self, platform, product_id, max_staleness):
+        """(fields, fresh fields) of the stored entry, or None."""
+        row = self._conn().execute("SELECT fields, fetched_at, field_times FROM details WHERE platform=? AND product_id=?",
+                                   (platform, product_id)).fetchone()
+        if not row: return None
+        fields = json.loads(row[0])
+        times = {field: row[1] for field in fields}
+        times.update(json.loads(row[2] or "{}"))
+        return fields, self.fresh_fields(fields, times, time.time(), max_staleness)
+
+    def get(self, platform, product_id, max_staleness=None):
+        """Returns (fields, fetched_at) if every cached field is within its TTL, else None.
+        `fetched_at` is when the oldest of them was fetched."""
+        if not product_id or product_id == "N/A" or max_staleness == 0: return None
+        entry = self._entry(platform, product_id, max_staleness)
+        result = None
+        if entry and len(entry[1]) == len(entry[0]):
+            result = entry[0], min((t for _, t in entry[1].values()), default=time.time())
+            with self._conn() as conn:
+                conn.execute("UPDATE details SET last_access=? WHERE platform=? AND product_id=?", (time.time(), platform, product_id))
+        with self._lock:
+            if result is None: self.misses += 1
+            else: self.hits += 1
+        return result
+
+    def refresh(self, platform, product_id, fields, max_staleness=None):
+        """Stores a page load's fields. Fields the load came back without (a block page, a partial render) are
+        filled from the cached entry while they are still within their TTL and keep their original fetch time.
+        Returns the fields to use."""
+        if not product_id or product_id == "N/A" or not fields: return fields
+        now = time.time()
+        times = {field: now for field in fields}
+        # Only remember real product pages, never block pages or empty parses
+        loaded = not _missing(fields.get("Product Name"))
+        entry = self._entry(platform, product_id, max_staleness) if max_staleness != 0 else None
+        if entry:
+            fields = dict(fields)
+            for field, (value, fetched_at) in entry[1].items():
+                if _missing(fields.get(field)) and not _missing(value):
+                    fields[field], times[field] = value, fetched_at
+        if loaded: self.put(platform, product_id, fields, times)
+        return fields
+
+    def put(self, platform, product_id, fields, times=None):
+        if not product_id or product_id == "N/A": return
+        now = time.time()
+        times = times or {field: now for field in fields}
+        conn = self._conn()
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO details (platform, product_id, fields, fetched_at, last_access, field_times) VALUES (?, ?, ?, ?, ?, ?)",
+                         (platform, product_id, json.dumps(fields), min(times.values(), default=now), now, json.dumps(times)))
+            count = conn.execute("SELECT COUNT(*) FROM details").fetchone()[0]
+            if count > self.max_entries:
+                # Evict the least recently used tenth in one go so puts near the limit stay cheap
+                excess = count - self.max_entries + self.max_entries // 10
+                conn.execute("DELETE FROM details WHERE rowid IN (SELECT rowid FROM details ORDER BY last_access LIMIT ?)", (excess,))
+
+    def stats(self):
+        count = self._conn().execute("SELECT COUNT(*) FROM details").fetchone()[0]
+        with self._lock:
+            total = self.hits + self.misses
+            return {"entries": count, "max_entries": self.max_entries, "hits": self.hits, "misses": self.misses,
+                    "hit_ratio": round(self.hits / total, 3) if total else None}
+
+DETAIL_CACHE = DetailCache(
+    os.environ.get("DETAIL_CACHE_PATH", "detail_cache.db"),
+    max_entries=int(os.environ.get("DETAIL_CACHE_MAX_ENTRIES", 50000)),
+)
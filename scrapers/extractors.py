@@ -0,0 +1,108 @@
+# In-page extractors for search result cards. Each one walks every card inside the browser
+# and returns plain records, so a whole results page costs a single evaluate() round trip
+# instead of several awaited handle calls per card.
+
+AMAZON_CARDS_JS = r"""
+() => Array.from(document.querySelectorAll('div[data-component-type="s-search-result"]')).map((card, i) => {
+    const link = card.querySelector('h2 a') || card.querySelector('a.a-link-normal.s-no-outline') || card.querySelector('a:has(h2)');
+    if (!link) return null;
+    const text = card.innerText || '';
+    let type = 'Organic';
+    if (card.querySelector('.puis-sponsored-label-text') || text.slice(0, 50).includes('Sponsored')) type = 'Sponsored';
+    else if (card.querySelector('span[aria-label="Amazon\'s Choice"]') || text.includes("Amazon's Choice")) type = "Amazon's Choice";
+    const price = card.querySelector('.a-price:not([data-a-strike]) .a-price-whole');
+    const rating = card.querySelector('i[class*="a-star"] .a-icon-alt') || card.querySelector('span.a-icon-alt');
+    const count = card.querySelector('a[aria-label$="ratings"]');
+    return {
+        href: link.getAttribute('href'),
+        result_type: type,
+        position: i + 1,
+        asin: card.getAttribute('data-asin') || null,
+        price: price ? price.textContent.replace(/[,.\s]/g, '') : null,
+        rating: rating ? rating.textContent.trim().split(/\s+/)[0] : null,
+        ratings_count: count ? count.getAttribute('aria-label').replace(/\D/g, '') : null,
+    };
+}).filter(Boolean)
+"""
+
+FLIPKART_CARDS_JS = r"""
+() => Array.from(document.querySelectorAll('div[data-id]')).map((card, i) => {
+    const link = card.querySelector('a');
+    if (!link) return null;
+    return { href: link.getAttribute('href'), position: i + 1, pid: card.getAttribute('data-id') };
+}).filter(Boolean)
+"""
+
+ZEPTO_CARDS_JS = r"""
+() => Array.from(document.querySelectorAll('[data-testid="product-card"]')).map((card, i) => {
+    const name = card.querySelector('h5') || card.querySelector('h4');
+    const price = card.querySelector('[data-testid="product-price"]');
+    const link = card.matches('a[href]') ? card : card.querySelector('a[href]');
+    return { position: i + 1, href: link ? link.getAttribute('href') : null, name: name ? name.innerText : null, price: price ? price.innerText.replace(/₹/g, '') : null };
+})
+"""
+
+JIOMART_CARDS_JS = r"""
+() => {
+    let cards = document.querySelectorAll('.ais-InfiniteHits-item');
+    if (!cards.length) cards = document.querySelectorAll('.plp-card-container');
+    return Array.from(cards).map((card, i) => {
+        const name = card.querySelector('div.plp-card-details-name');
+        const price = card.querySelector('span.plp-card-details-price-discounted') || card.querySelector('.plp-card-details-price');
+        const link = card.matches('a[href]') ? card : card.querySelector('a[href]');
+        return { position: i + 1, href: link ? link.getAttribute('href') : null, name: name ? name.innerText : null, price: price ? price.innerText.replace(/₹/g, '') : null };
+    });
+}
+"""
+
+# Blinkit and Swiggy class names are randomized, so the name is the first text line and the price the first ₹ amount.
+# On the quick-commerce sites the product link is either the card itself or the first anchor inside it.
+TEXT_CARDS_JS = r"""
+(selectors) => {
+    let cards = [];
+    for (const sel of selectors) {
+        cards = document.querySelectorAll(sel);
+        if (cards.length) break;
+    }
+    return Array.from(cards).map((card, i) => {
+        const text = card.innerText || '';
+        const price = text.match(/₹\s?(\d+)/);
+        const link = card.matches('a[href]') ? card : card.querySelector('a[href]');
+        return { position: i + 1, href: link ? link.getAttribute('href') : null, name: text.split('\n')[0] || null, price: price ? price[1] : null };
+    });
+}
+"""
+
+BIGBASKET_CARDS_JS = r"""
+() => {
+    let cards = [];
+    for (const sel of ['div[ng-repeat^="prod in"]', 'div.sku-card', 'li[class*="PaginatedList"]']) {
+        cards = document.querySelectorAll(sel);
+        if (cards.length) break;
+    }
+    return Array.from(cards).map((card, i) => {
+        const lines = (card.innerText || '').split('\n');
+        const priceLine = lines.find(l => l.includes('Rs') || l.includes('₹'));
+        const link = card.matches('a[href]') ? card : card.querySelector('a[href]');
+        return { position: i + 1, href: link ? link.getAttribute('href') : null, name: lines[0] || null, price: priceLine ? priceLine.replace('MRP', '').trim() : null };
+    });
+}
+"""
+
+CARD_EXTRACTORS = {
+    "amazon": (AMAZON_CARDS_JS, None),
+    "flipkart": (FLIPKART_CARDS_JS, None),
+    "zepto": (ZEPTO_CARDS_JS, None),
+    "jiomart": (JIOMART_CARDS_JS, None),
+    "blinkit": (TEXT_CARDS_JS, ['div[data-test-id="available-product-item"]', 'a[data-test-id="plp-product-item"]']),
+    "swiggy": (TEXT_CARDS_JS, ['[data-testid="product_card"]']),
+    "bigbasket": (BIGBASKET_CARDS_JS, None),
+}
+
+def register_card_extractor(platform, script, arg=None):
+    CARD_EXTRACTORS[platform] = (script, arg)
+
+async def extract_cards(page, platform):
+    """Returns one plain dict per search result card on the page, in page order."""
+    script, arg = CARD_EXTRACTORS[platform]
+    return await page.evaluate(script, arg)
@@ -0,0 +1,114 @@
+import asyncio
+import csv
+import io
+import os
+import time
+from scrapers.base import BaseScraper
+from scrapers.browser_pool import get_pool
+from scrapers.output import read_partial
+from scrapers.schemas import paise
+
+PLATFORM_NAMES = {
+    "amazon": "Amazon", "flipkart": "Flipkart", "blinkit": "Blinkit", "zepto": "Zepto",
+    "jiomart": "Jiomart", "swiggy": "Swiggy Instamart", "bigbasket": "Big Basket",
+}
+SEARCH_BUDGET = float(os.environ.get("SEARCH_BUDGET", 180)) # Seconds per platform, override with <PLATFORM>_SEARCH_BUDGET
+FANOUT_CONCURRENCY = int(os.environ.get("FANOUT_CONCURRENCY", 0)) # Platforms searched at once, 0 = half the browser pool's contexts
+FANOUT_PLATFORMS = [p.strip() for p in os.environ.get("FANOUT_PLATFORMS", ",".join(PLATFORM_NAMES)).split(",") if p.strip() in PLATFORM_NAMES]
+
+def normalized_price(row):
+    """Rupees as a plain number string ("1299", "42.5") from either price column, or None."""
+    value = paise(row.get("Price (INR)") or row.get("Price"))
+    return f"{value / 100:.2f}".rstrip("0").rstrip(".") if value is not None else None
+
+class AllPlatformsScraper(BaseScraper):
+    """Runs one keyword through every platform's run_search at once on this loop's shared browser pool,
+    each under its own time budget, and merges whatever each platform produced into one file with a
+    common column set. A platform that fails or runs out of time contributes the rows it had streamed.
+    The scheduler counts the whole fan-out as one job, so only `concurrency()` platforms hold a browser
+    context at a time and the rest queue; a platform's budget starts when it gets its turn."""
+    PLATFORM = "all"
+    PLATFORMS = tuple(FANOUT_PLATFORMS)
+
+    def __init__(self, job_id, jobs):
+        super().__init__(job_id, jobs)
+        self.budgets = {p: float(os.environ.get(f"{p.upper()}_SEARCH_BUDGET", SEARCH_BUDGET)) for p in self.PLATFORMS}
+
+    def concurrency(self):
+        if FANOUT_CONCURRENCY: return FANOUT_CONCURRENCY
+        pool = get_pool()
+        return max(1, pool.max_browsers * pool.contexts_per_browser // 2) if pool else 2
+
+    async def run_search(self, keyword):
+        from scrapers.registry import SCRAPERS
+        try:
+            children = {}
+            for platform in self.PLATFORMS:
+                child = SCRAPERS[platform](f"{self.job_id}-{platform}", self.jobs)
+                child.max_staleness, child.debug, child.job_type = self.max_staleness, self.debug, "search"
+                children[platform] = child
+            summary = self.state['platforms'] = {p: {"status": "Queued"} for p in children}
+            slots = asyncio.Semaphore(self.concurrency())
+
+            async def run(platform, child):
+                async with slots:
+                    start = time.perf_counter()
+                    try:
+                        await asyncio.wait_for(child.run_search(keyword), self.budgets[platform])
+                        status = child.state.get('status', 'Done!')
+                    except asyncio.TimeoutError:
+                        status = f"Timed out after {self.budgets[platform]:g}s"
+                    except Exception as e:
+                        status = f"Error: {e}"
+                summary[platform].update(status=status, seconds=round(time.perf_counter() - start, 1))
+                if child.state.get('debug_file'): summary[platform]["debug_file"] = child.state['debug_file']
+
+            tasks = [asyncio.ensure_future(run(p, c)) for p, c in children.items()]
+            try:
+                while True:
+                    done, _ = await asyncio.wait(tasks, timeout=2)
+                    for platform, child in children.items():
+                        if "seconds" not in summary[platform]: summary[platform]["status"] = child.state.get('status', 'Queued')
+                    finished = sum(1 for p in summary.values() if "seconds" in p)
+                    self.update_status(f"Searching {len(children)} platforms: {finished} finished", progress=finished, total=len(children))
+                    if len(done) == len(tasks): break
+            finally:
+                # A cancelled parent (lease lost, worker stopping) must not leave platforms holding browser contexts
+                for task in tasks: task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+            self.update_status("Merging results...")
+            fname = f"all_platforms_results_{self.job_id}.csv"
+            with self.result_writer(fname) as writer:
+                for platform, child in children.items():
+                    rows = self.child_rows(child)
+                    summary[platform]["rows"] = len(rows)
+                    for position, row in enumerate(rows, start=1):
+                        writer.write({
+                            "Platform": PLATFORM_NAMES[platform],
+                            "Product Name": row.get("Product Name") or "N/A",
+                            "Price (INR)": normalized_price(row),
+                            "Rating": row.get("Rating"),
+                            "URL": row.get("URL"),
+                            "Search Position": row.get("Search Position") or position,
+                            "Date Scraped": row.get("Date Scraped"),
+                        })
+            if not writer.count:
+                self.update_status("Error: No products found on any platform.", done=True)
+                return
+            self.update_status(f"Done! {writer.count} products from {sum(1 for p in summary.values() if p.get('rows'))} platforms",
+                               done=True, filename=writer.fname)
+        except Exception as e:
+            self.update_status(f"Error: {e}", done=True)
+
+    def child_rows(self, child):
+        """Rows a platform's search wrote, including a cut-off run's streamed rows (CSV only)."""
+        path = child.state.get('partial_file')
+        if not path or not os.path.exists(path): return []
+        return list(csv.DictReader(io.StringIO(read_partial(path).decode("utf-8-sig"))))
+
+    async def run_bulk(self, url_text):
+        self.update_status("Error: bulk scraping needs a single platform.", done=True)
+
+    async def run_reviews(self, product_url):
+        self.update_status("Error: review scraping needs a single platform.", done=True)
@@ -0,0 +1,419 @@
+# Offline extraction: the page HTML is captured once with page.content() and every selector,
+# JSON-LD lookup and regex runs here against lxml. The browser tab can be closed as soon as
+# the HTML is in hand, and parsing runs in EXTRACT_POOL instead of on the event loop.
+import asyncio
+import json
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+import lxml.html
+from lxml.cssselect import CSSSelector
+
+EXTRACT_POOL = ThreadPoolExecutor(max_workers=int(os.environ.get("EXTRACT_WORKERS", 4)), thread_name_prefix="extract")
+
+_PARSER = lxml.html.HTMLParser(encoding="utf-8")
+SKIP_TAGS = {"script", "style", "noscript", "template", "head"}
+BLOCK_TAGS = {
+    "address", "article", "aside", "blockquote", "br", "dd", "div", "dl", "dt", "fieldset", "figcaption", "figure",
+    "footer", "form", "h1", "h2", "h3", "h4", "h5", "h6", "header", "hr", "li", "main", "nav", "ol", "p", "pre",
+    "section", "table", "tbody", "td", "tfoot", "th", "thead", "tr", "ul",
+}
+
+async def extract(func, *args):
+    """Runs a parser from this module on the extraction pool."""
+    return await asyncio.get_running_loop().run_in_executor(EXTRACT_POOL, func, *args)
+
+def parse(html):
+    if not html or not html.strip(): return None
+    try:
+        return lxml.html.fromstring(html.encode("utf-8"), parser=_PARSER)
+    except Exception:
+        return None
+
+@lru_cache(maxsize=256)
+def _selector(css):
+    return CSSSelector(css, translator="html")
+
+def select(doc, css):
+    return _selector(css)(doc) if doc is not None else []
+
+def select_one(doc, *selectors):
+    """First match of the first selector that matches anything, like chained query_selector fallbacks."""
+    for css in selectors:
+        found = select(doc, css)
+        if found: return found[0]
+    return None
+
+def inner_text(el):
+    """Approximates Playwright's inner_text(): no script/style text, line breaks around block elements."""
+    if el is None: return ""
+    out = []
+
+    def walk(node):
+        tag = node.tag if isinstance(node.tag, str) else None
+        if tag and tag not in SKIP_TAGS:
+            block = tag in BLOCK_TAGS
+            if block: out.append("\n")
+            if node.text: out.append(node.text)
+            for child in node:
+                walk(child)
+                if child.tail: out.append(child.tail)
+            if block: out.append("\n")
+
+    walk(el)
+    text = re.sub(r"[ \t\r\f\v\xa0]+", " ", "".join(out))
+    return re.sub(r" *\n[ \n]*", "\n", text).strip()
+
+def json_ld_products(doc):
+    products = []
+    for script in select(doc, 'script[type="application/ld+json"]'):
+        try:
+            data = json.loads(script.text_content())
+        except Exception:
+            continue
+        items = data if isinstance(data, list) else data.get('@graph', [data]) if isinstance(data, dict) else []
+        products += [x for x in items if isinstance(x, dict) and x.get('@type') == 'Product']
+    return products
+
+def _first_offer(product):
+    offer = product.get('offers') or {}
+    if isinstance(offer, list): offer = offer[0] if offer else {}
+    return offer if isinstance(offer, dict) else {}
+
+# ---------------------------------------------------------
+# Block / interstitial detection
+# ---------------------------------------------------------
+def detect_block(html):
+    """Returns 'unavailable', 'captcha' or 'signin' for Amazon-style interstitials, else None."""
+    head = (html or "")[:200000]
+    if re.search(r"<title>\s*503\b|Service Unavailable Error", head): return "unavailable"
+    if "/errors/validateCaptcha" in head or "Enter the characters you see below" in head: return "captcha"
+    if 'id="auth-mfa-form"' in head or 'name="signIn"' in head or 'id="ap_email"' in head: return "signin"
+    return None
+
+# ---------------------------------------------------------
+# Amazon
+# ---------------------------------------------------------
+RANK_RE = re.compile(r"#(\d+[\d,]*)\s+in\s+([A-Za-z\s&,\-]+)")
+
+def amazon_ranks(body_text):
+    def clean_cat(text): return text.split("Feedback")[0].split("Would you like")[0].strip()
+    ranks = {"Primary Rank Number": "N/A", "Primary Rank Category": "N/A", "Secondary Rank Number": "N/A", "Secondary Rank Category": "N/A"}
+    rank_matches = RANK_RE.findall(body_text)
+    if len(rank_matches) > 0:
+        ranks["Primary Rank Number"], ranks["Primary Rank Category"] = f"#{rank_matches[0][0]}", clean_cat(rank_matches[0][1])
+    if len(rank_matches) > 1:
+        ranks["Secondary Rank Number"], ranks["Secondary Rank Category"] = f"#{rank_matches[1][0]}", clean_cat(rank_matches[1][1])
+    return ranks
+
+def amazon_product(html, timings=None):
+    """Product page fields. Price and Rating are None when missing so callers can fall back to the card.
+    Per-step wall time is added to `timings` when given."""
+    timings = timings if timings is not None else {}
+    start = time.perf_counter()
+    doc = parse(html)
+    timings["amazon.parse"] = time.perf_counter() - start
+    if doc is None: return None
+
+    start = time.perf_counter()
+    title_el = select_one(doc, "#productTitle")
+    price_el = select_one(doc, ".a-price-whole")
+    rating_el = select_one(doc, "span.a-icon-alt")
+    reviews_el = select_one(doc, "#acrCustomerReviewText")
+    bought_el = select_one(doc, "#social-proofing-faceout-title-text span", ".social-proofing-faceout-title-text span")
+    rating_parts = inner_text(rating_el).split()
+    timings["amazon.selectors"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    body = select_one(doc, "body")
+    ranks = amazon_ranks(inner_text(body if body is not None else doc))
+    timings["amazon.rank_regex"] = time.perf_counter() - start
+
+    return {
+        "Product Name": inner_text(title_el).strip() if title_el is not None else "N/A",
+        "Price (INR)": inner_text(price_el).replace(",", "").strip().rstrip('.') if price_el is not None else None,
+        "Rating": rating_parts[0] if rating_parts else None,
+        "Number of Ratings": "".join(filter(str.isdigit, inner_text(reviews_el))) if reviews_el is not None else "0",
+        "Bought in past month": inner_text(bought_el) if bought_el is not None else "N/A",
+        **ranks,
+    }
+
+def amazon_cards(html):
+    """Offline twin of extractors.AMAZON_CARDS_JS: same record shape."""
+    doc = parse(html)
+    cards = select(doc, 'div[data-component-type="s-search-result"]')
+    if not cards and doc is not None and doc.tag != "html": cards = [doc] # A single saved card
+    records = []
+    for i, card in enumerate(cards):
+        link = select_one(card, "h2 a", "a.a-link-normal.s-no-outline")
+        if link is None: link = next((a for a in select(card, "a") if select(a, "h2")), None)
+        if link is None: continue
+        text = inner_text(card)
+        r_type = "Organic"
+        if select(card, ".puis-sponsored-label-text") or "Sponsored" in text[:50]: r_type = "Sponsored"
+        elif select(card, 'span[aria-label="Amazon\'s Choice"]') or "Amazon's Choice" in text: r_type = "Amazon's Choice"
+        price = select_one(card, ".a-price:not([data-a-strike]) .a-price-whole")
+        rating = select_one(card, 'i[class*="a-star"] .a-icon-alt', "span.a-icon-alt")
+        count = select_one(card, 'a[aria-label$="ratings"]')
+        records.append({
+            "href": link.get("href"),
+            "result_type": r_type,
+            "position": i + 1,
+            "asin": card.get("data-asin") or next((el.get("data-asin") for el in select(card, "[data-asin]") if el.get("data-asin")), None),
+            "price": re.sub(r"[,.\s]", "", price.text_content()) if price is not None else None,
+            "rating": inner_text(rating).split()[0] if rating is not None else None,
+            "ratings_count": re.sub(r"\D", "", count.get("aria-label")) if count is not None else None,
+        })
+    return records
+
+def amazon_reviews(html):
+    doc = parse(html)
+    reviews = []
+    for card in select(doc, "div[data-hook='review']"):
+        name = select_one(card, ".a-profile-name")
+        rating = select_one(card, "i[data-hook='review-star-rating'] span.a-icon-alt")
+        date = select_one(card, "span[data-hook='review-date']")
+        body = select_one(card, "span[data-hook='review-body']")
+        if any(el is None for el in (name, rating, date, body)): continue
+        reviews.append({
+            "Review ID": card.get("id"),
+            "Reviewer Name": inner_text(name), "Rating": inner_text(rating).split()[0],
+            "Review Date": inner_text(date), "Review Text": inner_text(body).strip()
+        })
+    return reviews
+
+def amazon_review_count(html):
+    """Number of written reviews for the current review listing/filter ("1,234 total ratings, 567 with reviews")."""
+    doc = parse(html)
+    el = select_one(doc, "div[data-hook='cr-filter-info-review-rating-count']", "div[data-hook='cr-filter-info-review-count']")
+    if el is None: return None
+    text = inner_text(el)
+    match = re.search(r"([\d,]+)\s+with reviews", text) or re.search(r"of\s+([\d,]+)\s+reviews", text) or re.search(r"([\d,]+)", text)
+    return int(match.group(1).replace(",", "")) if match else None
+
+# ---------------------------------------------------------
+# Flipkart
+# ---------------------------------------------------------
+EXACT_PRICE_RE = re.compile(r"^₹\d{1,3}(?:,\d{3})*$")
+# Flipkart's MRP classes. Their line-through comes from an external stylesheet that the captured HTML
+# doesn't carry, so unlike getComputedStyle in the page they have to be known by name.
+STRUCK_CLASSES = {"yRaY8j", "_3I9_wc", "_3auQ3N"}
+
+def struck_classes(doc):
+    """STRUCK_CLASSES plus the classes the page's own <style> rules strike through."""
+    classes = set(STRUCK_CLASSES)
+    for style in select(doc, "style"):
+        for selectors, body in re.findall(r"([^{}]+)\{([^}]*)\}", style.text_content()):
+            if "line-through" not in body: continue
+            for selector in selectors.split(","):
+                if selector.split(): classes.update(re.findall(r"\.([\w-]+)", selector.split()[-1]))
+    return classes
+
+def is_struck(el, classes):
+    return any(node.tag in ("s", "del", "strike") or "line-through" in (node.get("style") or "") or not classes.isdisjoint((node.get("class") or "").split())
+               for node in (el, *el.iterancestors()))
+
+def flipkart_price_candidates(doc):
+    """Every element whose whole text is a rupee amount, in DOM order, with strike-through / MRP hints."""
+    out = []
+    struck = struck_classes(doc)
+    for order, el in enumerate(select(doc, "div, span, h1, h2, h3, h4")):
+        raw = el.text_content()
+        if len(raw) > 40 or "₹" not in raw: continue
+        txt = inner_text(el)
+        if not EXACT_PRICE_RE.match(txt): continue
+        parent = el.getparent()
+        out.append({
+            "value": int(txt.replace("₹", "").replace(",", "")),
+            "order": order,
+            "struck": is_struck(el, struck),
+            "mrp": bool(re.search(r"M\.?R\.?P", parent.text_content()[:40] if parent is not None else "", re.I)),
+        })
+    return out
+
+def pick_price(candidates):
+    # Filter out very small numbers (fees), then take the first selling price in DOM order.
+    # Struck-through / MRP amounts are only used if nothing else is left.
+    candidates = [c for c in candidates if c['value'] > 100]
+    selling = [c for c in candidates if not c['struck'] and not c['mrp']]
+    best = (selling or candidates or [None])[0]
+    return str(best['value']) if best else None
+
+def flipkart_product(html, timings=None):
+    """Flipkart product fields. Per-layer wall time is added to `timings` when given."""
+    doc = parse(html)
+    if doc is None: return None
+    timings = timings if timings is not None else {}
+    title, price, rating, ratings_count, json_price = "N/A", "N/A", "N/A", "N/A", None
+
+    # Layer 1: JSON-LD (Structured Data) - Good for Name/Rating/ID
+    start = time.perf_counter()
+    for data in json_ld_products(doc):
+        if 'name' in data and title == "N/A": title = data['name']
+        # JSON-LD Price is often unreliable (shows base price or offer price not main display)
+        # We will only use it as a fallback later if Visual extraction fails.
+        offer = _first_offer(data)
+        if 'price' in offer: json_price = str(offer['price'])
+        agg = data.get('aggregateRating') or {}
+        if 'ratingValue' in agg: rating = str(agg['ratingValue'])
+        if 'reviewCount' in agg: ratings_count = str(agg['reviewCount'])
+    timings["flipkart.layer1_jsonld"] = time.perf_counter() - start
+
+    # Layer 2: CSS Selectors (Visual Truth) - Specific Classes
+    start = time.perf_counter()
+    if title == "N/A":
+        el = select_one(doc, "span.B_NuCI", "h1.yhB1nd", "h1")
+        if el is not None: title = inner_text(el)
+
+    if price == "N/A":
+        for selector in ["div.Nx9bqj.CxhGGd", "div.Nx9bqj", "div._30jeq3._16Jk6d", "div._30jeq3"]:
+            el = select_one(doc, selector)
+            if el is not None:
+                cleaned = inner_text(el).replace("₹", "").replace(",", "").strip()
+                if cleaned.isdigit():
+                    price = cleaned
+                    break
+
+    if rating == "N/A":
+        el = select_one(doc, "div.XQDdHH", "div._3LWZlK")
+        if el is not None: rating = inner_text(el)
+
+    if ratings_count == "N/A":
+        for selector in ["span.Wphh3N", "span._2_R_DZ"]:
+            el = select_one(doc, selector)
+            if el is not None:
+                # Matches "47,384" inside "4.4 47,384 Ratings", the group adjacent to "Ratings"
+                match = re.search(r"(?<!\.)(\b[\d,]+)\s+Ratings", inner_text(el))
+                if match:
+                    ratings_count = match.group(1)
+                    break
+    timings["flipkart.layer2_selectors"] = time.perf_counter() - start
+
+    # Layer 3: Text content Search (Last Resort)
+    # "Extra ₹1000 off" or "₹86 Fee" are mixed text, so only elements holding *just* a price count.
+    if price == "N/A":
+        start = time.perf_counter()
+        price = pick_price(flipkart_price_candidates(doc)) or "N/A"
+        timings["flipkart.layer3_price_scan"] = time.perf_counter() - start
+
+    # JSON-LD Price Fallback (if Visual failed)
+    if price == "N/A" and json_price:
+        price = json_price
+
+    if rating == "N/A" or ratings_count == "N/A":
+        start = time.perf_counter()
+        body_text = inner_text(select_one(doc, "body"))
+        if rating == "N/A":
+            # Pattern: 4.3 [star?] [space] 45,585 Ratings
+            match = re.search(r"(\d\.\d)\s*★?\s*?[\d,]+\s*Ratings", body_text)
+            if match:
+                rating = match.group(1)
+            else:
+                # Pattern 2: Just proximity to "Ratings"
+                for m in re.finditer(r"Ratings", body_text):
+                    score_match = re.search(r"([3-5]\.\d)", body_text[max(0, m.start()-30):m.start()])
+                    if score_match:
+                        rating = score_match.group(1)
+                        break
+        if ratings_count == "N/A":
+            match = re.search(r"(?:^|\s)([\d,]+)\s+Ratings", body_text)
+            if match: ratings_count = match.group(1)
+        timings["flipkart.layer3_body_text"] = time.perf_counter() - start
+
+    return {"Product Name": title.strip(), "Price (INR)": price, "Rating": rating, "Number of Ratings": ratings_count}
+
+# ---------------------------------------------------------
+# Quick commerce
+# ---------------------------------------------------------
+def zepto_product(html):
+    doc = parse(html)
+    if doc is None: return None
+    name, price, rating, reviews_count = "N/A", "N/A", "N/A", "N/A"
+
+    # Strategy 0: JSON-LD
+    for data in json_ld_products(doc):
+        if 'name' in data: name = data['name']
+        offer = _first_offer(data)
+        if 'price' in offer: price = str(offer['price'])
+        elif 'lowPrice' in offer: price = str(offer['lowPrice'])
+        agg = data.get('aggregateRating') or {}
+        if 'ratingValue' in agg: rating = str(agg['ratingValue'])
+        if 'reviewCount' in agg: reviews_count = str(agg['reviewCount'])
+
+    # Fallbacks
+    if name == "N/A":
+        name_el = select_one(doc, "h1")
+        name = inner_text(name_el) if name_el is not None else "N/A"
+
+    if price == "N/A":
+        match = re.search(r"₹\s?([\d,]+)", inner_text(select_one(doc, '[data-testid="product-price"]')))
+        if match: price = match.group(1).replace(",", "")
+        if price == "N/A":
+            for el in select(doc, "h4, h5, div"):
+                txt = inner_text(el)
+                if "₹" in txt and len(txt) < 20:
+                    match = re.search(r"₹\s?([\d,]+)", txt)
+                    if match:
+                        price = match.group(1).replace(",", "")
+                        break
+
+    if rating == "N/A":
+        match = re.search(r"(\d\.\d)\s*\((\d+)\)", inner_text(select_one(doc, "body")))
+        if match: rating, reviews_count = match.group(1), match.group(2)
+
+    return {"Product Name": name, "Price": price, "Rating": rating, "Number of Reviews": reviews_count}
+
+def jiomart_product(html):
+    doc = parse(html)
+    if doc is None: return None
+    name, price, rating, count = "N/A", "N/A", "N/A", "N/A"
+
+    # Strategy 0: JSON-LD
+    for data in json_ld_products(doc):
+        if 'name' in data: name = data['name']
+        offer = _first_offer(data)
+        if 'price' in offer: price = str(offer['price'])
+        agg = data.get('aggregateRating') or {}
+        if 'ratingValue' in agg: rating = str(agg['ratingValue'])
+        if 'reviewCount' in agg: count = str(agg['reviewCount'])
+
+    # Strategy 1: CSS Fallbacks
+    if name == "N/A":
+        name_el = select_one(doc, "h1.product-title-name", "div.product-header-name h1", "h1")
+        if name_el is not None: name = inner_text(name_el)
+
+    if price == "N/A":
+        price_el = select_one(doc, ".product-price .price")
+        if price_el is not None:
+            price = inner_text(price_el).replace("₹", "").strip()
+        else:
+            # Use regex on specific containers, not entire body
+            m = re.search(r"₹\s?([\d,]+)", inner_text(select_one(doc, "#price-section")))
+            if m: price = m.group(1).replace(",", "")
+
+    if count == "N/A":
+        count_el = select_one(doc, ".rating-count", ".review-count")
+        if count_el is not None: count = inner_text(count_el)
+
+    return {"Product Name": name.strip(), "Price": price, "Rating": rating, "Number of Reviews": count}
+
+def h1_and_body_price(html):
+    """Blinkit / Swiggy: name from the H1, price from the first ₹ amount in the page text."""
+    doc = parse(html)
+    if doc is None: return None
+    name_el = select_one(doc, "h1")
+    price_match = re.search(r"₹\s?(\d+)", inner_text(select_one(doc, "body")))
+    return {"Product Name": inner_text(name_el) if name_el is not None else "N/A", "Price": price_match.group(1) if price_match else "N/A"}
+
+def bigbasket_product(html):
+    doc = parse(html)
+    if doc is None: return None
+    name_el = select_one(doc, "h1")
+    # BigBasket Price often in a table or DiscountedPrice class
+    price_el = select_one(doc, "td[data-qa='productPrice']", "div[data-qa='productPrice']")
+    return {
+        "Product Name": inner_text(name_el) if name_el is not None else "N/A",
+        "Price": inner_text(price_el).replace("Rs", "").replace("₹", "").strip() if price_el is not None else "N/A",
+    }
@@ -0,0 +1,74 @@
+# Fast path for server-rendered product pages: fetch with a pooled keep-alive HTTP/2 client and
+# parse the HTML offline. Scrapers only open a browser tab when this comes back blocked, empty
+# or without the fields they need.
+import asyncio
+import os
+import threading
+import httpx
+from scrapers.resource_policy import override_url
+
+BROWSER_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.9",
+    "Accept-Encoding": "gzip, deflate",
+    "Upgrade-Insecure-Requests": "1",
+    "Sec-Fetch-Dest": "document",
+    "Sec-Fetch-Mode": "navigate",
+    "Sec-Fetch-Site": "none",
+}
+
+# httpx clients are bound to the event loop that created them, so keep one per loop. The loop's owner
+# closes it with aclose_client() on shutdown; clients of loops that closed without that are dropped.
+_CLIENTS = {}
+
+def get_client():
+    loop = asyncio.get_running_loop()
+    for dead in [l for l in _CLIENTS if l.is_closed()]: del _CLIENTS[dead]
+    client = _CLIENTS.get(loop)
+    if client is None or client.is_closed:
+        client = _CLIENTS[loop] = httpx.AsyncClient(
+            http2=True,
+            headers=BROWSER_HEADERS,
+            follow_redirects=True,
+            timeout=httpx.Timeout(20, connect=10),
+            limits=httpx.Limits(max_connections=int(os.environ.get("HTTP_MAX_CONNECTIONS", 20)), max_keepalive_connections=10),
+        )
+    return client
+
+async def aclose_client():
+    """Closes the running loop's client and its keep-alive connections."""
+    client = _CLIENTS.pop(asyncio.get_running_loop(), None)
+    if client is not None: await client.aclose()
+
+async def fetch_html(url):
+    """Returns (status_code, html, final_url)."""
+    response = await get_client().get(override_url(url))
+    return response.status_code, response.text, str(response.url)
+
+class FetchStats:
+    """Process-wide fast-path vs browser-fallback counts and latencies per platform."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.platforms = {}
+
+    def record(self, platform, path, seconds):
+        with self._lock:
+            entry = self.platforms.setdefault(platform, {"fast": 0, "fallback": 0, "fast_ms": 0.0, "fallback_ms": 0.0})
+            entry[path] += 1
+            entry[f"{path}_ms"] += seconds * 1000
+
+    def snapshot(self):
+        with self._lock:
+            out = {}
+            for platform, e in self.platforms.items():
+                total = e["fast"] + e["fallback"]
+                out[platform] = {
+                    "fast": e["fast"], "fallback": e["fallback"],
+                    "fast_ratio": round(e["fast"] / total, 3) if total else None,
+                    "avg_fast_ms": round(e["fast_ms"] / e["fast"], 1) if e["fast"] else None,
+                    "avg_fallback_ms": round(e["fallback_ms"] / e["fallback"], 1) if e["fallback"] else None,
+                }
+            return out
+
+FETCH_STATS = FetchStats()
@@ -0,0 +1,189 @@
+import json
+import os
+import socket
+import threading
+import time
+from scrapers.sqlite_store import SQLiteStore
+
+class JobStore(SQLiteStore):
+    """Job status records in SQLite (WAL) so every gunicorn worker and worker loop sees the same jobs.
+
+    Records are plain dicts stored as JSON. Writers merge their fields into the stored record inside
+    a write transaction, so the scheduler and a running scraper can update the same job. Finished jobs
+    are evicted after `ttl` seconds, and jobs that never finished after `max_age`.
+
+    The process that queues or runs a job claims it: its owner (host:pid) heartbeats every
+    `heartbeat_interval` seconds. An unfinished job whose owner stopped heartbeating for `stale_after`
+    seconds, or whose pid is gone on this host, is marked interrupted and done, so it can be resumed."""
+    AUTOCOMMIT = True
+    def __init__(self, path, ttl=86400, max_age=7 * 86400, evict_every=60, poll_interval=1.0, heartbeat_interval=15, stale_after=60):
+        super().__init__(path)
+        self.heartbeat_interval = heartbeat_interval
+        self.stale_after = stale_after
+        self._heartbeat_pid = None # Process whose heartbeat thread is running; forked children start their own
+        self.poll_interval = poll_interval # How often waiters re-check for writes made by other processes
+        self._changed = threading.Condition()
+        self.ttl = ttl
+        self.max_age = max_age
+        self.evict_every = evict_every
+        self._last_evict = 0
+        with self._conn() as conn:
+            conn.execute("""CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY, record TEXT NOT NULL, done INTEGER NOT NULL,
+                created_at REAL NOT NULL, updated_at REAL NOT NULL)""")
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_updated ON jobs (done, updated_at)")
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(jobs)")]
+            if "owner" not in columns: conn.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+            if "heartbeat" not in columns: conn.execute("ALTER TABLE jobs ADD COLUMN heartbeat REAL")
+
+    def __getstate__(self):
+        # Handed to worker processes inside pickled scrapers; connections and locks are rebuilt there
+        return {"path": self.path, "ttl": self.ttl, "max_age": self.max_age, "evict_every": self.evict_every, "poll_interval": self.poll_interval,
+                "heartbeat_interval": self.heartbeat_interval, "stale_after": self.stale_after}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def create(self, job_id, **record):
+        now = time.time()
+        self._conn().execute("INSERT OR REPLACE INTO jobs (job_id, record, done, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                             (job_id, json.dumps(record, default=str), int(bool(record.get("done"))), now, now))
+        self._notify()
+        if now - self._last_evict > self.evict_every: self.evict()
+
+    def get(self, job_id, default=None):
+        row = self._conn().execute("SELECT record, done, owner, heartbeat FROM jobs WHERE job_id=?", (job_id,)).fetchone()
+        if row and self._orphaned(*row[1:]): return self._interrupt(job_id) or default
+        return json.loads(row[0]) if row else default
+
+    @staticmethod
+    def owner_id():
+        return f"{socket.gethostname()}:{os.getpid()}"
+
+    def claim(self, job_id):
+        """Makes this process the job's owner and keeps its heartbeat going until the job is done. Claiming
+        a job that was marked interrupted (a broker item handed to a new node) makes it running again."""
+        def merge(record):
+            if record.pop("interrupted", False): record.update(done=False, status="Restarting...")
+        self._modify(job_id, merge)
+        self._conn().execute("UPDATE jobs SET owner=?, heartbeat=? WHERE job_id=?", (self.owner_id(), time.time(), job_id))
+        if self._heartbeat_pid != os.getpid():
+            self._heartbeat_pid = os.getpid()
+            threading.Thread(target=self._heartbeat, name="job-heartbeat", daemon=True).start()
+
+    def _heartbeat(self):
+        owner = self.owner_id()
+        while True:
+            time.sleep(self.heartbeat_interval)
+            try:
+                self._conn().execute("UPDATE jobs SET heartbeat=? WHERE owner=? AND done=0", (time.time(), owner))
+            except Exception as e:
+                print(f"Job heartbeat failed: {e!r}")
+
+    def _orphaned(self, done, owner, heartbeat):
+        if done or not owner: return False
+        if heartbeat is not None and heartbeat < time.time() - self.stale_after: return True
+        host, _, pid = owner.rpartition(":")
+        if host != socket.gethostname() or not pid.isdigit(): return False
+        try:
+            os.kill(int(pid), 0)
+        except ProcessLookupError:
+            return True
+        except OSError:
+            pass # Exists but belongs to another user
+        return False
+
+    def _interrupt(self, job_id):
+        """Marks a job whose owner died as done and returns its record."""
+        def merge(record):
+            if record.get("done"): return
+            record.update(done=True, interrupted=True, status=f"Interrupted: the process running this job stopped ({record.get('status')})")
+        self._modify(job_id, merge)
+        self._conn().execute("UPDATE jobs SET owner=NULL WHERE job_id=? AND done=1", (job_id,))
+        row = self._conn().execute("SELECT record FROM jobs WHERE job_id=?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def __contains__(self, job_id):
+        return self._conn().execute("SELECT 1 FROM jobs WHERE job_id=?", (job_id,)).fetchone() is not None
+
+    def update(self, job_id, remove=(), **fields):
+        """Merges `fields` into the job's record and drops the keys in `remove`. Unknown jobs are ignored."""
+        def merge(record):
+            record.update(fields)
+            for key in remove: record.pop(key, None)
+        self._modify(job_id, merge)
+
+    def update_shard(self, job_id, shard, **fields):
+        """Records the progress of one shard of a sharded bulk job and rolls the shards up into the
+        job's own status and progress."""
+        def merge(record):
+            shards = record.setdefault("shards", {})
+            shards.setdefault(str(shard), {}).update(fields)
+            finished = sum(1 for s in shards.values() if s.get("done"))
+            failed = sum(1 for s in shards.values() if s.get("failed"))
+            record["progress"] = sum(s.get("progress") or 0 for s in shards.values())
+            record["total"] = sum(s.get("total") or 0 for s in shards.values())
+            record["status"] = f"{finished}/{record.get('shard_count', len(shards))} shards done{f', {failed} failed' if failed else ''}, {record['progress']}/{record['total']} URLs"
+        self._modify(job_id, merge)
+
+    def _modify(self, job_id, merge):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT record FROM jobs WHERE job_id=?", (job_id,)).fetchone()
+            if row:
+                record = json.loads(row[0])
+                merge(record)
+                conn.execute("UPDATE jobs SET record=?, done=?, updated_at=? WHERE job_id=?",
+                             (json.dumps(record, default=str), int(bool(record.get("done"))), time.time(), job_id))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        self._notify()
+
+    def _notify(self):
+        with self._changed:
+            self._changed.notify_all()
+
+    def wait_for_change(self, job_id, since, timeout):
+        """Blocks until the job is written after `since` (an updated_at value) and returns (record, updated_at).
+        Returns (None, since) if the job does not exist and None on timeout. Writes from this process wake
+        waiters at once, writes from other processes are picked up every poll_interval."""
+        deadline = time.monotonic() + timeout
+        while True:
+            row = self._conn().execute("SELECT record, updated_at, done, owner, heartbeat FROM jobs WHERE job_id=?", (job_id,)).fetchone()
+            if row is None: return None, since
+            if self._orphaned(*row[2:]):
+                self._interrupt(job_id)
+                continue
+            if row[1] > since: return json.loads(row[0]), row[1]
+            remaining = deadline - time.monotonic()
+            if remaining <= 0: return None
+            with self._changed:
+                self._changed.wait(min(remaining, self.poll_interval))
+
+    def pop(self, job_id, default=None):
+        record = self.get(job_id, default)
+        self._conn().execute("DELETE FROM jobs WHERE job_id=?", (job_id,))
+        self._notify()
+        return record
+
+    def evict(self):
+        now = time.time()
+        self._last_evict = now
+        for job_id, done, owner, heartbeat in self._conn().execute("SELECT job_id, done, owner, heartbeat FROM jobs WHERE done=0 AND owner IS NOT NULL").fetchall():
+            if self._orphaned(done, owner, heartbeat): self._interrupt(job_id)
+        self._conn().execute("DELETE FROM jobs WHERE (done=1 AND updated_at < ?) OR updated_at < ?", (now - self.ttl, now - self.max_age))
+
+    def stats(self):
+        done, running = self._conn().execute("SELECT COALESCE(SUM(done), 0), COUNT(*) - COALESCE(SUM(done), 0) FROM jobs").fetchone()
+        return {"jobs_done": done, "jobs_active": running, "ttl": self.ttl}
+
+JOB_STORE = JobStore(
+    os.environ.get("JOB_STORE_PATH", "jobs.db"),
+    ttl=float(os.environ.get("JOB_TTL", 86400)),
+    max_age=float(os.environ.get("JOB_MAX_AGE", 7 * 86400)),
+    heartbeat_interval=float(os.environ.get("JOB_HEARTBEAT_INTERVAL", 15)),
+    stale_after=float(os.environ.get("JOB_STALE_AFTER", 60)),
+)
@@ -0,0 +1,215 @@
+# Counters and histograms rendered in the Prometheus text format for /metrics.
+# Each process records its own values and writes them every METRICS_FLUSH_SECONDS to a file of its
+# own in METRICS_DIR. /metrics sums every process's file, so gunicorn workers, EXECUTION_MODE=process
+# children and broker nodes (pointed at a shared METRICS_DIR) all show up on the web tier's endpoint.
+# Gauges are read live in the serving process only.
+import atexit
+import json
+import math
+import os
+import socket
+import threading
+import time
+
+METRICS_DIR = os.path.abspath(os.environ.get("METRICS_DIR", "metrics_data"))
+METRICS_FLUSH_SECONDS = float(os.environ.get("METRICS_FLUSH_SECONDS", 10))
+METRICS_RETENTION = float(os.environ.get("METRICS_RETENTION", 86400)) # Files of processes that stopped writing are dropped after this
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}" if pairs else ""
+
+def _number(value):
+    if value == math.inf: return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help, labels=()):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(name)) for name in self.labels)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.values)
+
+    @staticmethod
+    def combine(total, value):
+        return total + value
+
+    def samples(self, values=None):
+        values = self.snapshot() if values is None else values
+        return [(self.name, key, (), value) for key, value in sorted(values.items())]
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self.values = {} # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name)) for name in self.labels)
+        with self._lock:
+            entry = self.values.get(key)
+            if entry is None: entry = self.values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound: entry[i] += 1
+            entry[-2] += value
+            entry[-1] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {key: list(entry) for key, entry in self.values.items()}
+
+    @staticmethod
+    def combine(total, entry):
+        return [a + b for a, b in zip(total, entry)]
+
+    def samples(self, values=None):
+        values = self.snapshot() if values is None else values
+        out = []
+        for key, entry in sorted(values.items()):
+            for bound, count in zip(self.buckets, entry):
+                out.append((f"{self.name}_bucket", key, (("le", _number(bound)),), count))
+            out.append((f"{self.name}_sum", key, (), round(entry[-2], 6)))
+            out.append((f"{self.name}_count", key, (), entry[-1]))
+        return out
+
+class Gauge:
+    """Read at scrape time from `fn`, which returns a number or a {label values tuple: number} dict."""
+    kind = "gauge"
+
+    def __init__(self, name, help, fn, labels=()):
+        self.name, self.help, self.labels, self.fn = name, help, tuple(labels), fn
+
+    def samples(self):
+        value = self.fn()
+        if not isinstance(value, dict): value = {(): value}
+        return [(self.name, key, (), v) for key, v in sorted(value.items()) if v is not None]
+
+class Registry:
+    def __init__(self, directory=None, flush_seconds=METRICS_FLUSH_SECONDS):
+        self.metrics = {}
+        self.directory = directory
+        self.flush_seconds = flush_seconds
+        self._export_pid = None
+
+    def _add(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help, labels=()):
+        return self._add(Counter(name, help, labels))
+
+    def histogram(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._add(Histogram(name, help, labels, buckets))
+
+    def gauge(self, name, help, fn, labels=()):
+        return self._add(Gauge(name, help, fn, labels))
+
+    def _recorded(self):
+        return [m for m in self.metrics.values() if m.kind != "gauge"]
+
+    def _process_file(self):
+        return os.path.join(self.directory, f"{socket.gethostname()}-{os.getpid()}.json")
+
+    def flush(self):
+        """Writes this process's counter and histogram values to its file in the shared directory."""
+        data = {m.name: [[list(key), value] for key, value in m.snapshot().items()] for m in self._recorded()}
+        if not any(data.values()): return
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._process_file()
+        with open(f"{path}.tmp", "w") as f: json.dump(data, f)
+        os.replace(f"{path}.tmp", path)
+
+    def start_export(self):
+        """Starts flushing from this process. Safe to call again, and after a fork."""
+        if not self.directory or self._export_pid == os.getpid(): return
+        self._export_pid = os.getpid()
+        def loop():
+            while True:
+                time.sleep(self.flush_seconds)
+                try:
+                    self.flush()
+                except OSError as e:
+                    print(f"Metrics flush failed: {e!r}")
+        threading.Thread(target=loop, name="metrics-export", daemon=True).start()
+
+    def _reset_after_fork(self):
+        # A forked child starts from zero; its parent's values stay in the parent's file
+        for metric in self._recorded():
+            metric._lock = threading.Lock()
+            metric.values = {}
+        self._export_pid = None
+        self.start_export()
+
+    def _others(self):
+        """Values from every other process's file, summed per metric."""
+        totals = {}
+        if not self.directory or not os.path.isdir(self.directory): return totals
+        own = os.path.basename(self._process_file())
+        for fname in os.listdir(self.directory):
+            path = os.path.join(self.directory, fname)
+            if fname == own or not fname.endswith(".json"): continue
+            try:
+                if os.path.getmtime(path) < time.time() - METRICS_RETENTION:
+                    os.remove(path)
+                    continue
+                with open(path) as f: data = json.load(f)
+            except (OSError, ValueError): continue
+            for name, entries in data.items():
+                metric = self.metrics.get(name)
+                if metric is None or metric.kind == "gauge": continue
+                values = totals.setdefault(name, {})
+                for key, value in entries:
+                    key = tuple(key)
+                    values[key] = metric.combine(values[key], value) if key in values else value
+        return totals
+
+    def render(self):
+        others = self._others()
+        lines = []
+        for metric in self.metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            if metric.kind == "gauge":
+                samples = metric.samples()
+            else:
+                values = metric.snapshot()
+                for key, value in others.get(metric.name, {}).items():
+                    values[key] = metric.combine(values[key], value) if key in values else value
+                samples = metric.samples(values)
+            for name, key, extra, value in samples:
+                lines.append(f"{name}{_labels(metric.labels, key, extra)} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry(METRICS_DIR)
+
+# Labelled by platform and job type (search, bulk, reviews, merge)
+STAGE_SECONDS = REGISTRY.histogram("scraper_stage_seconds", "Wall time of scrape stages: navigation, extraction, sleeps, export", ("platform", "job_type", "stage"))
+PAGES = REGISTRY.counter("scraper_pages_total", "Pages fetched, by path (http fast path or browser tab)", ("platform", "job_type", "path"))
+BLOCKS = REGISTRY.counter("scraper_blocks_total", "Responses that looked like a CAPTCHA, sign-in wall, 429 or 503", ("platform", "job_type"))
+FAILURES = REGISTRY.counter("scraper_item_failures_total", "Products or pages that produced no row", ("platform", "job_type"))
+CACHE = REGISTRY.counter("scraper_detail_cache_total", "Detail cache lookups", ("platform", "job_type", "result"))
+JOBS_FINISHED = REGISTRY.counter("scraper_jobs_finished_total", "Jobs that reached a final status", ("platform", "job_type", "outcome"))
+QUEUE_WAIT = REGISTRY.histogram("scraper_queue_wait_seconds", "Time jobs spent in the scheduler queue", ("job_type",),
+                                buckets=(0.1, 0.5, 1, 5, 10, 30, 60, 300, 900, 3600))
+
+REGISTRY.start_export()
+os.register_at_fork(after_in_child=REGISTRY._reset_after_fork)
+atexit.register(lambda: REGISTRY.directory and REGISTRY.flush())
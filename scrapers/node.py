@@ -0,0 +1,70 @@
+# Headless worker node for EXECUTION_MODE=broker: python -m scrapers.node [slots]
+# Leases jobs and bulk shards from the broker file, runs them on local browser pools and writes status
+# and rows back to the shared JobStore and CheckpointStore. Nodes run on the web tier's host: the broker,
+# job and checkpoint files are SQLite in WAL mode, whose shared-memory index does not work over network
+# filesystems, so they must be on a local disk. Start as many node processes as the host's browsers allow,
+# with BROKER_PATH, JOB_STORE_PATH and CHECKPOINT_PATH pointing at the web tier's files, OUTPUT_DIR at its
+# output directory (where /download serves from) and METRICS_DIR at its metrics directory.
+import os
+import sys
+import threading
+import time
+from concurrent.futures import TimeoutError
+from scrapers.broker import broker_from_env, new_owner_id
+from scrapers.browser_pool import pool_from_env
+from scrapers.job_store import JOB_STORE
+from scrapers.registry import SCRAPERS
+from scrapers.workers import WorkerLoops
+
+IDLE_POLL = float(os.environ.get("BROKER_POLL", 2.0))
+
+def run_item(broker, owner, workers, item):
+    scraper = SCRAPERS[item["platform"]](item["job_id"], JOB_STORE)
+    for key, value in item["attrs"].items(): setattr(scraper, key, value)
+    scraper.job_type = item["method"].removeprefix("run_")
+    if item["kind"] == "merge": scraper.failed_shards = broker.failed_shards(item["group_id"])
+    print(f"[{owner}] {item['method']} {item['job_id']} (attempt {item['attempts']})")
+    JOB_STORE.claim(item["job_id"])
+    future = workers.submit(getattr(scraper, item["method"]), item["arg"])
+    while True:
+        try:
+            future.result(timeout=broker.visibility_timeout / 3)
+            error = None
+            break
+        except TimeoutError:
+            if not broker.heartbeat(item["id"], owner):
+                # Lease expired and was handed to another node; let it own the job from here
+                print(f"[{owner}] lost lease on {item['job_id']}, abandoning")
+                future.cancel()
+                return
+        except Exception as e:
+            error = repr(e)
+            break
+    # Scrapers catch their own errors and only report them in the job record
+    status = (JOB_STORE.get(item["job_id"]) or {}).get("status") or ""
+    if error is None and status.startswith("Error"): error = status.removeprefix("Error: ")
+    broker.complete(item["id"], owner, error)
+
+def slot(broker, workers, index):
+    owner = f"{new_owner_id()}-{index}"
+    while True:
+        item = broker.lease(owner)
+        if item is None:
+            time.sleep(IDLE_POLL)
+            continue
+        try:
+            run_item(broker, owner, workers, item)
+        except Exception as e:
+            print(f"[{owner}] {item['job_id']} failed: {e!r}")
+            broker.complete(item["id"], owner, repr(e))
+
+def main(slots):
+    broker = broker_from_env(JOB_STORE)
+    workers = WorkerLoops(int(os.environ.get("WORKER_LOOPS", 1)), pool_from_env)
+    threads = [threading.Thread(target=slot, args=(broker, workers, i), name=f"broker-slot-{i}", daemon=True) for i in range(slots)]
+    for thread in threads: thread.start()
+    print(f"Worker node up: {slots} slots, broker {broker.path}")
+    for thread in threads: thread.join()
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else int(os.environ.get("NODE_SLOTS", 2)))
@@ -0,0 +1,87 @@
+import csv
+import os
+import time
+import pyarrow.parquet as pq
+from openpyxl import Workbook
+from scrapers.schemas import SCHEMAS, arrow_schema, record_batch
+
+PARQUET_BATCH_ROWS = int(os.environ.get("PARQUET_BATCH_ROWS", 1000))
+# Where every process that runs jobs (web workers, process-mode children, broker nodes) writes output files
+# and debug bundles, whatever its working directory; the web tier serves /download from here.
+# Defaults to the app directory.
+OUTPUT_DIR = os.path.abspath(os.environ.get("OUTPUT_DIR", os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+def output_path(name):
+    return os.path.join(OUTPUT_DIR, name)
+
+class ResultWriter:
+    """Appends result rows to a CSV, XLSX or Parquet file as they are produced instead of holding them in memory.
+
+    Columns are the schema's for `kind` (see scrapers/schemas.py), or the first row's keys when there is
+    none; a row carrying a column outside them raises ValueError rather than losing it. CSV rows are flushed one by one, so the file itself can be served
+    while the job runs. XLSX (openpyxl write-only mode) and Parquet cannot be read before they are closed,
+    so their rows are also mirrored to a `.partial.csv` sidecar that is removed once the file is saved.
+    Parquet uses the typed schema for `kind` and is written in record batches.
+    `timer(stage, seconds)` is told how long each write and the final save took."""
+    def __init__(self, fname, kind=None, timer=None):
+        self.fname = fname
+        self.timer = timer
+        self.kind = kind
+        self.xlsx = fname.endswith(".xlsx")
+        self.parquet = fname.endswith(".parquet")
+        self.partial_path = f"{fname}.partial.csv" if self.xlsx or self.parquet else fname
+        self.columns = SCHEMAS.get(kind)
+        self.count = 0
+        self._csv_file = open(self.partial_path, "w", newline="", encoding="utf-8-sig")
+        self._csv = None
+        if self.xlsx:
+            self._book = Workbook(write_only=True)
+            self._sheet = self._book.create_sheet()
+        if self.parquet:
+            self._batch = []
+            self._parquet = pq.ParquetWriter(fname, arrow_schema(kind), compression="zstd")
+
+    def write(self, row):
+        start = time.perf_counter()
+        if self._csv is None:
+            if self.columns is None: self.columns = list(row)
+            self._csv = csv.DictWriter(self._csv_file, self.columns)
+            self._csv.writeheader()
+            if self.xlsx: self._sheet.append(self.columns)
+        unknown = [c for c in row if c not in self.columns]
+        if unknown: raise ValueError(f"{self.fname}: row has columns outside the header: {unknown}")
+        self._csv.writerow(row)
+        self._csv_file.flush()
+        if self.xlsx: self._sheet.append([row.get(c) for c in self.columns])
+        if self.parquet:
+            self._batch.append(row)
+            if len(self._batch) >= PARQUET_BATCH_ROWS: self._flush_batch()
+        self.count += 1
+        if self.timer: self.timer("export.write", time.perf_counter() - start)
+
+    def _flush_batch(self):
+        if self._batch: self._parquet.write_batch(record_batch(self.kind, self._batch))
+        self._batch = []
+
+    def write_rows(self, rows):
+        for row in rows: self.write(row)
+
+    def close(self):
+        start = time.perf_counter()
+        self._csv_file.close()
+        if self.xlsx: self._book.save(self.fname)
+        if self.parquet:
+            self._flush_batch()
+            self._parquet.close()
+        if self.partial_path != self.fname: os.remove(self.partial_path)
+        if self.timer: self.timer("export.save", time.perf_counter() - start)
+
+    def __enter__(self): return self
+
+    def __exit__(self, *exc): self.close()
+
+def read_partial(path):
+    """Returns the complete lines written to a streaming CSV so far, without a half-written last row."""
+    with open(path, "rb") as f:
+        data = f.read()
+    return data[:data.rfind(b"\n") + 1]
@@ -0,0 +1,157 @@
+import itertools
+import multiprocessing
+import pickle
+import threading
+import time
+from concurrent.futures import Future
+from scrapers.browser_pool import PoolThread
+
+class WorkerCrashed(Exception):
+    pass
+
+def _worker_main(index, inbox, outbox, pool_factory, loops):
+    """Entry point of a worker process: its own Playwright driver(s) and browsers, fed jobs from `inbox`."""
+    threads = [PoolThread(pool_factory(), name=f"scrape-loop-{i}").start() for i in range(max(1, loops))]
+    inflight = [0] * len(threads)
+    lock = threading.Lock()
+
+    def finished(i, task_id, future):
+        with lock: inflight[i] -= 1
+        error = future.exception()
+        outbox.put(("done", index, task_id, repr(error) if error else None))
+
+    def heartbeat():
+        while True:
+            with lock: running = list(inflight)
+            outbox.put(("stats", index, [{"running_jobs": n, **t.pool.stats()} for n, t in zip(running, threads)]))
+            time.sleep(5)
+
+    threading.Thread(target=heartbeat, name="worker-heartbeat", daemon=True).start()
+    while True:
+        task = inbox.get()
+        if task is None:
+            for thread in threads: thread.stop()
+            return
+        task_id, payload = task
+        func, args = pickle.loads(payload)
+        with lock:
+            i = min(range(len(threads)), key=inflight.__getitem__)
+            inflight[i] += 1
+        future = threads[i].submit(func(*args))
+        future.add_done_callback(lambda f, i=i, task_id=task_id: finished(i, task_id, f))
+
+class _Worker:
+    def __init__(self, index):
+        self.index = index
+        self.process = None
+        self.inbox = None
+        self.restarts = 0
+        self.stats = []
+
+class ProcessWorkers:
+    """Drop-in alternative to WorkerLoops that runs jobs in separate processes, each owning its own
+    Playwright driver and browsers, so parsing and export scale past the GIL and a crash only takes
+    down one worker. Crashed workers are restarted and their jobs resubmitted (bulk jobs pick up
+    from their checkpoints) up to `max_retries` times.
+
+    Jobs are pickled, so they must be bound methods of scrapers or other module-level callables.
+    Processes are spawned on the first submit: spawn re-imports the main module in every child,
+    and a child must not start workers of its own while doing so."""
+    def __init__(self, count, pool_factory, loops_per_process=1, max_retries=1):
+        self.count = max(1, count)
+        self.pool_factory = pool_factory
+        self.loops_per_process = loops_per_process
+        self.max_retries = max_retries
+        self.ctx = multiprocessing.get_context("spawn")
+        self.workers = [_Worker(i) for i in range(self.count)]
+        self.tasks = {} # task_id -> {"payload", "future", "worker", "attempts", "func"}
+        self.submitted = 0
+        self.retried = 0
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._started = False
+
+    def _start(self):
+        self.outbox = self.ctx.Queue()
+        for worker in self.workers: self._spawn(worker)
+        threading.Thread(target=self._collect, name="worker-results", daemon=True).start()
+        threading.Thread(target=self._watch, name="worker-watchdog", daemon=True).start()
+        self._started = True
+
+    def _spawn(self, worker):
+        worker.inbox = self.ctx.Queue()
+        worker.process = self.ctx.Process(
+            target=_worker_main, args=(worker.index, worker.inbox, self.outbox, self.pool_factory, self.loops_per_process),
+            name=f"scrape-worker-{worker.index}", daemon=True,
+        )
+        worker.process.start()
+
+    def _inflight(self, worker):
+        return sum(1 for t in self.tasks.values() if t["worker"] is worker)
+
+    def submit(self, func, *args):
+        """Thread-safe: runs func(*args) on the least busy worker process. Returns a concurrent.futures.Future."""
+        payload = pickle.dumps((func, args)) # Fail here, not in a feeder thread, if the job can't be sent
+        future = Future()
+        with self._lock:
+            if not self._started: self._start()
+            worker = min(self.workers, key=self._inflight)
+            task_id = next(self._seq)
+            self.tasks[task_id] = {"payload": payload, "future": future, "worker": worker, "attempts": 1, "func": func}
+            self.submitted += 1
+            worker.inbox.put((task_id, payload))
+        return future
+
+    def _collect(self):
+        while True:
+            kind, index, *rest = self.outbox.get()
+            if kind == "stats":
+                self.workers[index].stats = rest[0]
+                continue
+            task_id, error = rest
+            with self._lock:
+                task = self.tasks.pop(task_id, None)
+            if task is None: continue
+            if error: task["future"].set_exception(RuntimeError(error))
+            else: task["future"].set_result(None)
+
+    def _watch(self):
+        while True:
+            time.sleep(1)
+            with self._lock:
+                for worker in self.workers:
+                    if worker.process.is_alive(): continue
+                    print(f"Worker {worker.index} died (exit code {worker.process.exitcode}), restarting")
+                    worker.restarts += 1
+                    worker.stats = []
+                    self._spawn(worker)
+                    for task_id, task in list(self.tasks.items()):
+                        if task["worker"] is not worker: continue
+                        if task["attempts"] > self.max_retries:
+                            del self.tasks[task_id]
+                            self._give_up(task)
+                            continue
+                        task["attempts"] += 1
+                        self.retried += 1
+                        worker.inbox.put((task_id, task["payload"]))
+
+    def _give_up(self, task):
+        scraper = getattr(task["func"], "__self__", None)
+        if hasattr(scraper, "update_status"):
+            scraper.update_status("Error: worker process crashed", done=True)
+        task["future"].set_exception(WorkerCrashed("worker process crashed"))
+
+    def stats(self):
+        with self._lock:
+            return {
+                "mode": "process",
+                "jobs_submitted": self.submitted,
+                "jobs_retried": self.retried,
+                "workers": [{
+                    "pid": w.process.pid if w.process else None,
+                    "alive": bool(w.process and w.process.is_alive()),
+                    "restarts": w.restarts,
+                    "running_jobs": self._inflight(w),
+                    "loops": w.stats,
+                } for w in self.workers],
+            }
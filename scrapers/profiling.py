@@ -0,0 +1,175 @@
+# Per-job debug capture, cheap enough to leave on for a sample of production jobs:
+# - a sampling profiler (folded stacks, flamegraph-ready) on the job's event loop thread, and on the
+#   extraction pool threads while they run this job's parsers. The event loop is shared by every job
+#   on that loop, so its samples include the other jobs' coroutines; extract samples are this job's only.
+# - a per-URL timeline of every timed stage (navigation, selector waits, extraction, sleeps, export)
+# - Playwright traces (network + DOM snapshots) kept only for the slowest N page loads
+# - the exception behind every product that produced no row
+# Everything is zipped into debug_<job_id>.zip when the job finishes.
+import asyncio
+import contextvars
+import functools
+import heapq
+import itertools
+import json
+import os
+import random
+import shutil
+import sys
+import threading
+import time
+import traceback
+import zipfile
+from collections import Counter
+from scrapers.output import output_path
+
+DEBUG_SAMPLE_RATE = float(os.environ.get("DEBUG_SAMPLE_RATE", 0)) # Fraction of jobs profiled without asking
+DEBUG_TRACE_PAGES = int(os.environ.get("DEBUG_TRACE_PAGES", 5)) # Slowest page loads whose Playwright trace is kept
+SAMPLE_INTERVAL = float(os.environ.get("DEBUG_SAMPLE_INTERVAL", 0.01)) # Seconds between stack samples
+MAX_EVENTS = 20000
+
+CURRENT_URL = contextvars.ContextVar("current_url", default=None)
+
+def wants_profile(requested):
+    return requested or random.random() < DEBUG_SAMPLE_RATE
+
+class StackSampler:
+    """Samples the Python stacks of the registered threads every `interval` seconds from a background thread.
+    Each stack is rooted at its thread's label ("loop", "extract")."""
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL):
+        self.threads = {thread_id: "loop"} # thread id -> label; extract threads come and go
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            for thread_id, label in dict(self.threads).items():
+                frame = frames.get(thread_id)
+                if frame is None: continue
+                stack = []
+                while frame is not None and len(stack) < 64:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                stack.append(label)
+                self.stacks[";".join(reversed(stack))] += 1
+                self.samples += 1
+
+    def sampled(self, func, label="extract"):
+        """Wraps `func` so whichever thread runs it is sampled while it runs."""
+        @functools.wraps(func)
+        def run(*args):
+            thread_id = threading.get_ident()
+            self.threads[thread_id] = label
+            try:
+                return func(*args)
+            finally:
+                self.threads.pop(thread_id, None)
+        return run
+
+    def stop(self):
+        self._stop.set()
+
+    def folded(self):
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def top_functions(self, limit=40):
+        """Leaf (self-time) and inclusive sample counts per function."""
+        leaf, inclusive = Counter(), Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")
+            leaf[frames[-1]] += count
+            for name in set(frames): inclusive[name] += count
+        lines = [f"{self.samples} samples every {self.interval * 1000:g} ms", "", "self  inclusive  function"]
+        for name, count in leaf.most_common(limit):
+            lines.append(f"{count:>5}  {inclusive[name]:>9}  {name}")
+        return "\n".join(lines) + "\n"
+
+class JobProfile:
+    def __init__(self, job_id, trace_pages=DEBUG_TRACE_PAGES):
+        self.job_id = job_id
+        self.dir = output_path(f"debug_{job_id}")
+        os.makedirs(os.path.join(self.dir, "traces"), exist_ok=True)
+        self.started = time.perf_counter()
+        self.trace_pages = trace_pages
+        self.traced = [] # min-heap of (seconds, seq, path), the slowest loads kept so far
+        self._seq = itertools.count()
+        self.events = []
+        self.pages = {} # url -> seconds for the whole item
+        self.failures = []
+        self.sampler = StackSampler(threading.get_ident()).start() # Started on the job's event loop thread
+        self.tracing_lock = None
+
+    def event(self, stage, seconds):
+        if len(self.events) >= MAX_EVENTS: return
+        end = time.perf_counter() - self.started
+        self.events.append({"url": CURRENT_URL.get(), "stage": stage, "start_ms": round((end - seconds) * 1000, 1), "ms": round(seconds * 1000, 1)})
+
+    def page_done(self, url, seconds):
+        self.pages[url] = round(seconds, 3)
+
+    def failure(self, url, error):
+        self.failures.append({"url": url, "error": repr(error), "traceback": "".join(traceback.format_exception(error))})
+
+    async def traced_load(self, context, url, load):
+        """Runs `load()` inside a trace chunk when no other page of this job is being traced (chunks are
+        context-wide) and keeps the chunk only if the load is among the slowest so far."""
+        if self.tracing_lock is None: self.tracing_lock = asyncio.Lock()
+        if self.trace_pages <= 0 or self.tracing_lock.locked(): return await load()
+        async with self.tracing_lock:
+            try:
+                await context.tracing.start_chunk(title=url)
+            except Exception:
+                return await load() # Tracing was not started on this context
+            start = time.perf_counter()
+            try:
+                return await load()
+            finally:
+                seconds = time.perf_counter() - start
+                keep = len(self.traced) < self.trace_pages or seconds > self.traced[0][0]
+                path = os.path.join(self.dir, "traces", f"{next(self._seq):04d}_{seconds:.1f}s.zip")
+                try:
+                    await context.tracing.stop_chunk(path=path if keep else None)
+                except Exception:
+                    keep = False
+                if keep:
+                    heapq.heappush(self.traced, (seconds, next(self._seq), path))
+                    if len(self.traced) > self.trace_pages:
+                        _, _, dropped = heapq.heappop(self.traced)
+                        if os.path.exists(dropped): os.remove(dropped)
+                    with open(path + ".url", "w") as f: f.write(url)
+
+    def finish(self):
+        """Stops sampling and writes debug_<job_id>.zip. Returns its path."""
+        self.sampler.stop()
+        slowest = sorted(self.pages.items(), key=lambda item: -item[1])
+        summary = {
+            "job_id": self.job_id,
+            "wall_s": round(time.perf_counter() - self.started, 3),
+            "slowest_pages": slowest[:20],
+            "failures": len(self.failures),
+            "traces": [{"seconds": round(s, 3), "file": os.path.basename(p)} for s, _, p in sorted(self.traced, reverse=True)],
+            "events": len(self.events),
+            "events_truncated": len(self.events) >= MAX_EVENTS,
+            "sampling": "loop stacks include every job on this event loop; extract stacks are this job's parsers only",
+        }
+        path = f"{self.dir}.zip"
+        with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as bundle:
+            bundle.writestr("summary.json", json.dumps(summary, indent=2))
+            bundle.writestr("timeline.json", json.dumps(self.events))
+            bundle.writestr("failures.json", json.dumps(self.failures, indent=2))
+            bundle.writestr("profile.folded", self.sampler.folded())
+            bundle.writestr("profile_top.txt", self.sampler.top_functions())
+            for _, _, trace in self.traced:
+                if os.path.exists(trace): bundle.write(trace, f"traces/{os.path.basename(trace)}")
+                if os.path.exists(trace + ".url"): bundle.write(trace + ".url", f"traces/{os.path.basename(trace)}.url")
+        shutil.rmtree(self.dir, ignore_errors=True)
+        return path
@@ -0,0 +1,101 @@
+# Per-domain pacing shared by every job in the process. Each domain gets a token bucket whose
+# rate grows additively while pages come back clean and is halved when the site starts serving
+# CAPTCHAs, sign-in walls or 503s (AIMD, the same shape as TCP congestion control).
+import asyncio
+import collections
+import os
+import threading
+import time
+import urllib.parse
+from scrapers.html_extract import detect_block
+
+# Starting requests/second per domain, roughly the old fixed sleeps spread over the detail tabs
+START_RATES = {
+    "amazon.in": 1.0,
+    "flipkart.com": 2.0,
+}
+DEFAULT_RATE = 1.0
+MIN_RATE = float(os.environ.get("RATE_MIN", 0.1))
+MAX_RATE = float(os.environ.get("RATE_MAX", 5.0))
+RATE_STEP = float(os.environ.get("RATE_STEP", 0.05)) # Added per healthy response
+BACKOFF = 0.5 # Rate multiplier on a block
+BACKOFF_COOLDOWN = 10 # Seconds; blocks seen by tabs already in flight don't halve the rate again
+
+def looks_blocked(status, final_url, html):
+    return status in (429, 503) or "/ap/signin" in (final_url or "") or detect_block(html) is not None
+
+class DomainLimiter:
+    """Token bucket for one domain. Thread-safe, so tabs on every worker loop share the same budget."""
+    def __init__(self, domain, rate):
+        self.domain = domain
+        self.rate = rate
+        self.burst = max(1.0, rate)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.last_backoff = 0
+        self.recent = collections.deque(maxlen=100) # True for blocked responses
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """Takes a token and returns how long the caller must wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            self.requests += 1
+            return 0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def record(self, blocked):
+        with self._lock:
+            self.recent.append(blocked)
+            now = time.monotonic()
+            if blocked:
+                if now - self.last_backoff >= BACKOFF_COOLDOWN:
+                    self.rate = max(MIN_RATE, self.rate * BACKOFF)
+                    self.tokens = min(self.tokens, 0)
+                    self.last_backoff = now
+            else:
+                self.rate = min(MAX_RATE, self.rate + RATE_STEP)
+            self.burst = max(1.0, self.rate)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "rate": round(self.rate, 3),
+                "requests": self.requests,
+                "recent_block_rate": round(sum(self.recent) / len(self.recent), 3) if self.recent else None,
+            }
+
+class RateLimiter:
+    def __init__(self):
+        self.domains = {}
+        self._lock = threading.Lock()
+
+    def limiter(self, url):
+        host = (urllib.parse.urlsplit(url).hostname or "").removeprefix("www.")
+        with self._lock:
+            if host not in self.domains:
+                self.domains[host] = DomainLimiter(host, START_RATES.get(host, DEFAULT_RATE))
+            return self.domains[host]
+
+    async def acquire(self, url):
+        """Waits for a token for the URL's domain. Returns the seconds waited."""
+        if os.environ.get("RATE_LIMIT", "1") == "0": return 0
+        delay = self.limiter(url).reserve()
+        if delay: await asyncio.sleep(delay)
+        return delay
+
+    def record(self, url, status, final_url, html):
+        """Feeds a response back into its domain's rate. Returns True if it looked blocked."""
+        blocked = looks_blocked(status, final_url, html)
+        self.limiter(url).record(blocked)
+        return blocked
+
+    def stats(self):
+        with self._lock:
+            domains = list(self.domains.items())
+        return {host: limiter.stats() for host, limiter in domains}
+
+RATE_LIMITER = RateLimiter()
@@ -0,0 +1,20 @@
+from scrapers.amazon import AmazonScraper
+from scrapers.flipkart import FlipkartScraper
+from scrapers.blinkit import BlinkitScraper
+from scrapers.zepto import ZeptoScraper
+from scrapers.jiomart import JiomartScraper
+from scrapers.swiggy import SwiggyScraper
+from scrapers.bigbasket import BigBasketScraper
+from scrapers.fanout import AllPlatformsScraper
+
+SCRAPERS = {
+    'amazon': AmazonScraper, 'flipkart': FlipkartScraper, 'blinkit': BlinkitScraper, 'zepto': ZeptoScraper,
+    'jiomart': JiomartScraper, 'swiggy': SwiggyScraper, 'bigbasket': BigBasketScraper,
+    'all': AllPlatformsScraper, # Search only: every platform above at once, merged
+}
+
+# Per-job options set from the request form; they travel with brokered jobs to worker nodes
+JOB_OPTIONS = ("max_staleness", "output_format", "since_last_run", "debug")
+
+def job_options(scraper):
+    return {key: getattr(scraper, key) for key in JOB_OPTIONS if hasattr(scraper, key)}
@@ -0,0 +1,105 @@
+import os
+import urllib.parse
+
+# We only read text, DOM and JSON-LD, so heavy assets are never needed
+BLOCKED_TYPES = {"image", "media", "font", "texttrack", "beacon", "ping", "eventsource", "websocket", "manifest"}
+
+# Typical transfer size of a request of each type (HTTP Archive medians, rounded). A blocked request never
+# reports its size, so bytes saved are an estimate from these.
+BLOCKED_BYTES_ESTIMATE = {
+    "image": 15_000, "media": 250_000, "font": 25_000, "script": 20_000, "stylesheet": 10_000,
+    "xhr": 3_000, "fetch": 3_000, "document": 30_000,
+}
+DEFAULT_BYTES_ESTIMATE = 1_000
+
+# Analytics / ad beacons, blocked on every platform
+TRACKER_HOSTS = (
+    "google-analytics.com", "googletagmanager.com", "doubleclick.net", "googlesyndication.com",
+    "facebook.net", "facebook.com", "amazon-adsystem.com", "unagi.amazon.com", "unagi-eu.amazon.com",
+    "fls-eu.amazon.in", "fls-eu.amazon.com", "fls-na.amazon.com", "scorecardresearch.com", "hotjar.com", "clarity.ms",
+    "branch.io", "appsflyer.com", "moengage.com", "sentry.io", "newrelic.com", "nr-data.net",
+    "criteo.com", "taboola.com", "clevertap-prod.com", "webengage.com", "mixpanel.com",
+)
+
+# Hosts allowed to serve scripts / XHR / styles for each platform. Anything else of those
+# types is third-party and dropped. Documents are always allowed so redirects still work.
+POLICIES = {
+    "amazon": ("amazon.in", "media-amazon.com", "ssl-images-amazon.com", "images-amazon.com"),
+    "flipkart": ("flipkart.com", "flixcart.com", "flipkart.net"),
+    "zepto": ("zeptonow.com", "zepto.co.in", "zeptonow.in"),
+    "jiomart": ("jiomart.com", "jio.com", "ril.com"),
+    "blinkit": ("blinkit.com", "grofers.com"),
+    "swiggy": ("swiggy.com", "swiggy.in", "swiggy.net"),
+    "bigbasket": ("bigbasket.com", "bbassets.com", "bigbasket.in"),
+}
+
+def _host_matches(host, suffixes):
+    return any(host == s or host.endswith("." + s) for s in suffixes)
+
+def should_block(platform, resource_type, url):
+    """Returns the reason a request should be blocked, or None to let it through."""
+    if resource_type in BLOCKED_TYPES: return resource_type
+    host = urllib.parse.urlsplit(url).hostname or ""
+    if _host_matches(host, TRACKER_HOSTS): return "tracker"
+    allowed = POLICIES.get(platform)
+    if allowed and resource_type != "document" and not _host_matches(host, allowed): return "third-party"
+    return None
+
+def new_network_stats():
+    return {"requests_allowed": 0, "requests_blocked": 0, "bytes_allowed": 0, "bytes_blocked_estimate": 0, "blocked_by_reason": {}}
+
+async def apply_resource_policy(context, platform, stats):
+    """Installs the platform's request filter on a BrowserContext. Counts the bytes each allowed request
+    actually transferred (headers and encoded body, so chunked and HTTP/2 responses without a
+    content-length are included) and estimates the bytes the blocked ones would have cost."""
+    if os.environ.get("BLOCK_RESOURCES", "1") == "0": return
+
+    async def handle(route):
+        request = route.request
+        reason = should_block(platform, request.resource_type, request.url)
+        if reason:
+            stats["requests_blocked"] += 1
+            stats["blocked_by_reason"][reason] = stats["blocked_by_reason"].get(reason, 0) + 1
+            stats["bytes_blocked_estimate"] += BLOCKED_BYTES_ESTIMATE.get(request.resource_type, DEFAULT_BYTES_ESTIMATE)
+            await route.abort()
+        else:
+            stats["requests_allowed"] += 1
+            await route.continue_()
+
+    async def on_finished(request):
+        try:
+            sizes = await request.sizes()
+        except Exception: return # Context closed before the sizes were read
+        stats["bytes_allowed"] += max(0, sizes["responseHeadersSize"]) + max(0, sizes["responseBodySize"])
+
+    await context.route("**/*", handle)
+    context.on("requestfinished", on_finished)
+
+def site_override():
+    """SITE_OVERRIDE=http://127.0.0.1:<port> sends every platform request to a local mock site (benchmarks)."""
+    return os.environ.get("SITE_OVERRIDE")
+
+def _platform_host(host):
+    return any(_host_matches(host, suffixes) for suffixes in POLICIES.values())
+
+def override_url(url):
+    """Rewrites a platform URL to its SITE_OVERRIDE address, /<host><path>?<query>. Other URLs are unchanged."""
+    base = site_override()
+    if not base: return url
+    parts = urllib.parse.urlsplit(url)
+    if not _platform_host(parts.hostname or ""): return url
+    return f"{base}/{parts.hostname}{parts.path or '/'}" + (f"?{parts.query}" if parts.query else "")
+
+async def apply_site_override(context):
+    """Serves platform requests from SITE_OVERRIDE. Installed after the resource policy so it runs first;
+    anything it doesn't own falls back to the policy."""
+    if not site_override(): return
+
+    async def handle(route):
+        target = override_url(route.request.url)
+        if target == route.request.url:
+            await route.fallback()
+            return
+        await route.fulfill(response=await route.fetch(url=target))
+
+    await context.route("**/*", handle)
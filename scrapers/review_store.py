@@ -0,0 +1,38 @@
+import json
+import os
+import time
+from scrapers.sqlite_store import SQLiteStore
+
+class ReviewStore(SQLiteStore):
+    """Every Amazon review seen so far, per ASIN and keyed by Amazon's review ID, so refreshes can stop
+    at the first review they already have."""
+    def __init__(self, path):
+        super().__init__(path)
+        with self._conn() as conn:
+            conn.execute("""CREATE TABLE IF NOT EXISTS reviews (
+                asin TEXT NOT NULL, review_id TEXT NOT NULL, review TEXT NOT NULL, first_seen REAL NOT NULL,
+                PRIMARY KEY (asin, review_id))""")
+
+    def count(self, asin):
+        return self._conn().execute("SELECT COUNT(*) FROM reviews WHERE asin=?", (asin,)).fetchone()[0]
+
+    def add(self, asin, reviews):
+        """Stores reviews and returns the ones that were not stored before. Reviews without an ID can't be
+        matched later, so they are always returned and never stored."""
+        fresh = []
+        now = time.time()
+        with self._conn() as conn:
+            for review in reviews:
+                if not review.get("Review ID"):
+                    fresh.append(review)
+                    continue
+                cur = conn.execute("INSERT OR IGNORE INTO reviews VALUES (?, ?, ?, ?)", (asin, review["Review ID"], json.dumps(review), now))
+                if cur.rowcount: fresh.append(review)
+        return fresh
+
+    def reviews(self, asin):
+        """Yields every stored review for the ASIN, newest run first."""
+        rows = self._conn().execute("SELECT review FROM reviews WHERE asin=? ORDER BY first_seen DESC, rowid", (asin,))
+        for (review,) in rows: yield json.loads(review)
+
+REVIEW_STORE = ReviewStore(os.environ.get("REVIEW_STORE_PATH", "reviews.db"))
@@ -0,0 +1,78 @@
+import heapq
+import itertools
+import threading
+import time
+from scrapers.metrics import QUEUE_WAIT
+
+# Lower runs first. Bulk jobs are pushed back further by their URL count.
+PRIORITY_SEARCH = 0
+PRIORITY_REVIEWS = 1
+PRIORITY_BULK = 2
+
+class QueueFull(Exception):
+    pass
+
+class JobScheduler:
+    """Bounded priority queue in front of the worker loops with a global concurrency limit."""
+    def __init__(self, workers, jobs, max_running=2, max_queued=50):
+        self.workers = workers
+        self.jobs = jobs # JobStore
+        self.max_running = max_running
+        self.max_queued = max_queued
+        self.queue = []   # heap of (priority, seq, job_id, func, args, queued_at)
+        self.running = set()
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        threading.Thread(target=self._dispatch, name="job-scheduler", daemon=True).start()
+
+    def submit(self, job_id, func, *args, priority=PRIORITY_SEARCH):
+        with self._cond:
+            if len(self.queue) >= self.max_queued:
+                raise QueueFull(f"Queue is full ({self.max_queued} jobs waiting)")
+            heapq.heappush(self.queue, (priority, next(self._seq), job_id, func, args, time.monotonic()))
+            self._refresh_positions()
+            self._cond.notify_all()
+
+    def _refresh_positions(self):
+        for pos, entry in enumerate(sorted(self.queue), start=1):
+            self.jobs.update(entry[2], queue_position=pos, status=f"Queued (position {pos})")
+
+    def _dispatch(self):
+        while True:
+            with self._cond:
+                while not self.queue or len(self.running) >= self.max_running:
+                    self._cond.wait()
+                _, _, job_id, func, args, queued_at = heapq.heappop(self.queue)
+                self.running.add(job_id)
+            # One bad job (unpicklable arguments, a locked store) must not stop the dispatcher
+            try:
+                QUEUE_WAIT.observe(time.monotonic() - queued_at, job_type=func.__name__.removeprefix("run_"))
+                with self._cond:
+                    self.jobs.update(job_id, remove=('queue_position',), status="Starting...")
+                    self._refresh_positions()
+                future = self.workers.submit(func, *args)
+            except Exception as e:
+                self._failed(job_id, e)
+                continue
+            future.add_done_callback(lambda f, job_id=job_id: self._finished(job_id))
+
+    def _failed(self, job_id, error):
+        self._finished(job_id)
+        try:
+            self.jobs.update(job_id, remove=('queue_position',), status=f"Error: could not start job ({error})", done=True)
+        except Exception:
+            pass
+
+    def _finished(self, job_id):
+        with self._cond:
+            self.running.discard(job_id)
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            return {"running": len(self.running), "queued": len(self.queue), "max_running": self.max_running, "max_queued": self.max_queued}
+
+def bulk_priority(url_text):
+    """Small bulk lists stay close to searches, huge ones sink to the back of the queue."""
+    count = len([u for u in (url_text or "").replace(",", " ").split() if u])
+    return PRIORITY_BULK + count // 100
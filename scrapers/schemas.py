@@ -0,0 +1,107 @@
+# Typed Arrow schemas for the Parquet export. Scrapers keep producing display rows (strings, "N/A",
+# "#1,234"), and each column here maps one of those to a typed, snake_case field with nulls for
+# anything missing or unparseable.
+import re
+from datetime import datetime
+import pyarrow as pa
+
+MISSING = (None, "", "N/A", "NA")
+
+def _text(value):
+    if value in MISSING: return None
+    return str(value).strip() or None
+
+def _number(value):
+    text = _text(value)
+    if text is None: return None
+    match = re.search(r"\d[\d,]*(?:\.\d+)?", text)
+    return float(match.group().replace(",", "")) if match else None
+
+def paise(value):
+    """"1,299", "₹1,299.50", "Rs 99" -> integer paise."""
+    number = _number(value)
+    return round(number * 100) if number is not None else None
+
+def rating(value):
+    number = _number(value)
+    return number if number is not None and number <= 5 else None
+
+def integer(value):
+    """"1,172", "#1,234", "(45)" -> int."""
+    number = _number(value)
+    return int(number) if number is not None else None
+
+def bought(value):
+    """"5K+ bought in past month" -> 5000, the lower bound Amazon shows."""
+    text = _text(value)
+    match = re.search(r"([\d.]+)\s*([KkLM]?)\+?\s*bought", text or "")
+    if not match: return None
+    return int(float(match.group(1)) * {"": 1, "K": 1000, "k": 1000, "L": 100000, "M": 1000000}[match.group(2)])
+
+def timestamp(value):
+    text = _text(value)
+    try:
+        return datetime.strptime(text, "%Y-%m-%d %H:%M:%S") if text else None
+    except ValueError:
+        return None
+
+def review_date(value):
+    """"Reviewed in India on 5 January 2025" -> date."""
+    match = re.search(r"(\d{1,2} \w+ \d{4})", _text(value) or "")
+    try:
+        return datetime.strptime(match.group(1), "%d %B %Y").date() if match else None
+    except ValueError:
+        return None
+
+# Row column -> (field name, Arrow type, converter)
+COLUMNS = {
+    "Product Name": ("product_name", pa.string(), _text),
+    "Price (INR)": ("price_paise", pa.int64(), paise),
+    "Price": ("price_paise", pa.int64(), paise),
+    "Rating": ("rating", pa.float32(), rating),
+    "Number of Ratings": ("ratings_count", pa.int64(), integer),
+    "Number of Reviews": ("reviews_count", pa.int64(), integer),
+    "ASIN": ("asin", pa.string(), _text),
+    "Product ID": ("product_id", pa.string(), _text),
+    "PVID": ("product_id", pa.string(), _text),
+    "Primary Rank Number": ("primary_rank", pa.int64(), integer),
+    "Primary Rank Category": ("primary_rank_category", pa.string(), _text),
+    "Secondary Rank Number": ("secondary_rank", pa.int64(), integer),
+    "Secondary Rank Category": ("secondary_rank_category", pa.string(), _text),
+    "Result Type": ("result_type", pa.string(), _text),
+    "Search Position": ("search_position", pa.int32(), integer),
+    "Bought in past month": ("bought_past_month", pa.int64(), bought),
+    "Platform": ("platform", pa.string(), _text),
+    "Date Scraped": ("scraped_at", pa.timestamp("s"), timestamp),
+    "URL": ("url", pa.string(), _text),
+    "Input URL": ("input_url", pa.string(), _text),
+    "Review ID": ("review_id", pa.string(), _text),
+    "Reviewer Name": ("reviewer_name", pa.string(), _text),
+    "Review Date": ("review_date", pa.date32(), review_date),
+    "Review Text": ("review_text", pa.string(), _text),
+}
+
+_GROCERY = ["Product Name", "Price", "Platform", "URL", "Date Scraped", "Input URL"]
+
+# Columns each scraper's rows can carry, in output order. Rows missing a column get a null.
+SCHEMAS = {
+    "amazon": ["Product Name", "Price (INR)", "Rating", "Number of Ratings", "ASIN", "Primary Rank Number", "Primary Rank Category",
+               "Secondary Rank Number", "Secondary Rank Category", "Result Type", "Search Position", "Bought in past month", "Date Scraped", "URL", "Input URL"],
+    "amazon_reviews": ["Review ID", "Reviewer Name", "Rating", "Review Date", "Review Text"],
+    "flipkart": ["Product Name", "Price (INR)", "Rating", "Number of Ratings", "Product ID", "Result Type", "Date Scraped", "URL", "Input URL"],
+    "zepto": ["Product Name", "Price", "Rating", "Number of Reviews", "PVID", "Platform", "URL", "Date Scraped", "Input URL"],
+    "jiomart": ["Product Name", "Price", "Rating", "Number of Reviews", "Product ID", "Platform", "URL", "Date Scraped", "Input URL"],
+    "blinkit": _GROCERY,
+    "swiggy": _GROCERY,
+    "bigbasket": _GROCERY,
+    "all": ["Platform", "Product Name", "Price (INR)", "Rating", "URL", "Search Position", "Date Scraped"],
+}
+
+def arrow_schema(kind):
+    return pa.schema([pa.field(COLUMNS[c][0], COLUMNS[c][1]) for c in SCHEMAS[kind]])
+
+def record_batch(kind, rows):
+    """Converts display rows into one typed RecordBatch."""
+    columns = SCHEMAS[kind]
+    arrays = [pa.array([COLUMNS[c][2](row.get(c)) for row in rows], type=COLUMNS[c][1]) for c in columns]
+    return pa.RecordBatch.from_arrays(arrays, schema=arrow_schema(kind))
@@ -0,0 +1,21 @@
+import sqlite3
+import threading
+
+class SQLiteStore:
+    """Base for the SQLite-backed stores: one connection per thread (sqlite3 connections can't be shared
+    across threads), opened on first use in WAL mode so readers never block the writer. WAL needs shared
+    memory between the processes using the file, so the file must be on a local disk, never a network share.
+    Stores that run their own BEGIN IMMEDIATE transactions set AUTOCOMMIT."""
+    AUTOCOMMIT = False
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path, timeout=30, **({"isolation_level": None} if self.AUTOCOMMIT else {}))
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
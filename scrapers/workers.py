@@ -0,0 +1,37 @@
+import threading
+from scrapers.browser_pool import PoolThread
+
+class WorkerLoops:
+    """A fixed set of long-lived event loops. Each loop owns one Playwright driver and its BrowserPool,
+    and every job submitted to it shares them."""
+    def __init__(self, count, pool_factory):
+        self.loops = [PoolThread(pool_factory(), name=f"scrape-loop-{i}").start() for i in range(max(1, count))]
+        self.inflight = [0] * len(self.loops)
+        self.submitted = 0
+        self._lock = threading.Lock()
+
+    def submit(self, func, *args):
+        """Thread-safe: runs func(*args) on the least busy loop. Returns a concurrent.futures.Future."""
+        with self._lock:
+            i = min(range(len(self.loops)), key=self.inflight.__getitem__)
+            self.inflight[i] += 1
+            self.submitted += 1
+        future = self.loops[i].submit(func(*args))
+        future.add_done_callback(lambda f: self._finished(i))
+        return future
+
+    def _finished(self, i):
+        with self._lock:
+            self.inflight[i] -= 1
+
+    def stop(self):
+        for thread in self.loops: thread.stop()
+
+    def stats(self):
+        with self._lock:
+            inflight = list(self.inflight)
+        return {
+            "mode": "threads",
+            "jobs_submitted": self.submitted,
+            "loops": [{"running_jobs": n, **t.pool.stats()} for n, t in zip(inflight, self.loops)],
+        }
@@ -0,0 +1,49 @@
+import asyncio
+import pytest
+from scrapers import fanout, output
+from scrapers.job_store import JobStore
+from scrapers.registry import SCRAPERS
+
+class FakeChild:
+    """Stands in for a platform scraper: records how many searches run at once and which got cancelled."""
+    running, peak, cancelled = 0, 0, []
+
+    def __init__(self, job_id, jobs):
+        self.job_id, self.state = job_id, {}
+
+    async def run_search(self, keyword):
+        FakeChild.running += 1
+        FakeChild.peak = max(FakeChild.peak, FakeChild.running)
+        try:
+            await asyncio.sleep(0.2)
+            self.state['status'] = "Done!"
+        except asyncio.CancelledError:
+            FakeChild.cancelled.append(self.job_id)
+            raise
+        finally:
+            FakeChild.running -= 1
+
+@pytest.fixture
+def scraper(tmp_path, monkeypatch):
+    monkeypatch.setattr(output, "OUTPUT_DIR", str(tmp_path))
+    for platform in fanout.PLATFORM_NAMES: monkeypatch.setitem(SCRAPERS, platform, FakeChild)
+    monkeypatch.setattr(fanout, "FANOUT_CONCURRENCY", 2)
+    FakeChild.running, FakeChild.peak, FakeChild.cancelled = 0, 0, []
+    return fanout.AllPlatformsScraper("job", JobStore(str(tmp_path / "jobs.db")))
+
+def test_platforms_share_the_concurrency_cap(scraper):
+    scraper.budgets = {p: 0.3 for p in scraper.PLATFORMS} # Queued platforms are not timed out while they wait
+    asyncio.run(scraper.run_search("milk"))
+    assert FakeChild.peak == 2
+    assert all(p["status"] == "Done!" for p in scraper.state['platforms'].values())
+
+def test_cancelling_the_job_cancels_its_platforms(scraper):
+    async def cancel_midway():
+        task = asyncio.ensure_future(scraper.run_search("milk"))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError): await task
+        # Checked before asyncio.run tears the loop down, which would cancel leftover tasks itself
+        assert FakeChild.running == 0
+        assert len(FakeChild.cancelled) == 2
+    asyncio.run(cancel_midway())
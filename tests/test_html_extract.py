@@ -0,0 +1,70 @@
+import os
+import pytest
+from scrapers import html_extract
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES_DIR = os.path.join(REPO_DIR, "tests", "fixtures")
+
+def read(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+def test_amazon_search_card():
+    cards = html_extract.amazon_cards(read(os.path.join(REPO_DIR, "debug_first_card.html")))
+    assert len(cards) == 1
+    card = cards[0]
+    assert card["asin"] == "B0DN162F92"
+    assert card["price"] == "4999"
+    assert card["rating"] == "4.5"
+    assert card["ratings_count"] == "1172"
+    assert card["result_type"] == "Sponsored"
+    assert card["href"].startswith("/sspa/click")
+
+@pytest.mark.parametrize("fname, kind", [
+    ("debug_page_dump.html", "unavailable"),
+    ("debug_reviews_page.html", "signin"),
+    ("debug_reviews_dump.html", "signin"),
+    ("debug_first_card.html", None),
+])
+def test_detect_block(fname, kind):
+    assert html_extract.detect_block(read(os.path.join(REPO_DIR, fname))) == kind
+
+def test_detect_captcha():
+    assert html_extract.detect_block('<form action="/errors/validateCaptcha"></form>') == "captcha"
+
+def test_amazon_reviews():
+    html = read(os.path.join(FIXTURES_DIR, "amazon_reviews.html"))
+    reviews = html_extract.amazon_reviews(html)
+    assert [r["Review ID"] for r in reviews] == ["R1ZX8QK2M4N7PA", "R3B7TY0WQ1CX9E", "R2KJ5HD8PL3MZQ"]
+    assert reviews[0]["Reviewer Name"] == "Ananya Rao"
+    assert [r["Rating"] for r in reviews] == ["5.0", "2.0", "4.0"]
+    assert reviews[1]["Review Date"] == "Reviewed in India on 3 February 2026"
+    assert reviews[0]["Review Text"] == "Heats up fast and the basket is easy to clean.\nFries come out crisp with a spoon of oil."
+    assert html_extract.amazon_review_count(html) == 3
+
+def test_sign_in_wall_has_no_reviews():
+    html = read(os.path.join(REPO_DIR, "debug_reviews_page.html"))
+    assert html_extract.amazon_reviews(html) == []
+
+def test_amazon_product():
+    fields = html_extract.amazon_product(read(os.path.join(FIXTURES_DIR, "amazon_product.html")))
+    assert fields["Product Name"] == "AGARO Supreme Sandwich Maker, 1400W, Grill Plates, Non-Stick"
+    assert fields["Price (INR)"] == "2499" # Not the struck M.R.P.
+    assert fields["Rating"] == "4.2"
+    assert fields["Number of Ratings"] == "3210"
+    assert fields["Bought in past month"] == "500+ bought in past month"
+    assert (fields["Primary Rank Number"], fields["Primary Rank Category"]) == ("#1,234", "Home & Kitchen")
+    assert (fields["Secondary Rank Number"], fields["Secondary Rank Category"]) == ("#12", "Sandwich Makers")
+
+def test_flipkart_product_skips_struck_mrp():
+    timings = {}
+    fields = html_extract.flipkart_product(read(os.path.join(FIXTURES_DIR, "flipkart_product.html")), timings)
+    assert fields == {"Product Name": "Pigeon by Stovekraft Sandwich Maker  (Black)", "Price (INR)": "1299", "Rating": "4.1", "Number of Ratings": "47384"}
+    assert "flipkart.layer3_price_scan" in timings # The price came from the text scan, past the MRP listed first
+
+def test_flipkart_price_struck_by_page_stylesheet():
+    html = """<html><head><style>.hl05eU .old, .x { text-decoration: line-through; }</style></head>
+    <body><div class="hl05eU"><div class="old">₹899</div><div class="now">₹649</div></div></body></html>"""
+    candidates = html_extract.flipkart_price_candidates(html_extract.parse(html))
+    assert [(c["value"], c["struck"]) for c in candidates] == [(899, True), (649, False)]
+    assert html_extract.pick_price(candidates) == "649"
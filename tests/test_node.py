@@ -0,0 +1,48 @@
+import os
+import pytest
+import app
+from scrapers import node, output
+from scrapers.base import BaseScraper
+from scrapers.broker import Broker
+from scrapers.browser_pool import BrowserPool
+from scrapers.job_store import JobStore
+from scrapers.registry import SCRAPERS
+from scrapers.workers import WorkerLoops
+
+class FakeScraper(BaseScraper):
+    """A search that writes two rows without opening a browser."""
+    PLATFORM = "fake"
+
+    async def run_search(self, keyword):
+        with self.result_writer(f"fake_results_{self.job_id}.csv") as writer:
+            writer.write_rows([{"Product Name": f"{keyword} {n}", "Price": n * 10} for n in (1, 2)])
+        self.update_status("Done!", done=True, filename=writer.fname)
+
+@pytest.fixture
+def workers():
+    workers = WorkerLoops(1, lambda: BrowserPool(health_interval=0))
+    yield workers
+    workers.stop()
+
+def test_job_run_by_a_node_downloads_from_the_web_tier(tmp_path, monkeypatch, workers):
+    jobs = JobStore(str(tmp_path / "jobs.db"))
+    broker = Broker(str(tmp_path / "broker.db"), jobs=jobs)
+    monkeypatch.setattr(node, "JOB_STORE", jobs)
+    monkeypatch.setattr(app, "JOBS", jobs)
+    monkeypatch.setattr(output, "OUTPUT_DIR", str(tmp_path / "output"))
+    monkeypatch.setitem(SCRAPERS, "fake", FakeScraper)
+    os.makedirs(tmp_path / "output")
+    os.makedirs(tmp_path / "node")
+
+    jobs.create("job1", status="Queued", done=False)
+    broker.enqueue("job1", "fake", "run_search", "milk")
+    monkeypatch.chdir(tmp_path / "node") # The node's working directory is not where the web tier serves from
+    node.run_item(broker, "node-a", workers, broker.lease("node-a"))
+    monkeypatch.chdir(tmp_path)
+
+    assert jobs.get("job1")["status"] == "Done!"
+    assert broker.stats()["items"] == {"done": 1}
+    assert not os.listdir(tmp_path / "node")
+    response = app.app.test_client().get("/download/job1")
+    assert response.status_code == 200
+    assert response.data.decode("utf-8-sig").splitlines() == ["Product Name,Price", "milk 1,10", "milk 2,20"]
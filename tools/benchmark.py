@@ -0,0 +1,232 @@
+# Offline throughput benchmark: python -m tools.benchmark [options]
+# Starts the mock site, points every scraper at it through SITE_OVERRIDE and runs each scenario's
+# run_search / run_bulk / run_reviews end to end on a real browser pool. Each run appends one JSON
+# line (commit, settings, per-scenario metrics) to the results file so runs can be compared across commits.
+# Page latency (p50_ms / p95_ms) is what the scraper waited per page load, browser tab or HTTP fast path;
+# server_p50_ms / server_p95_ms are the mock site's own handling times, injected latency included.
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+from tools.mock_site import MockSite
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CLK_TCK = os.sysconf("SC_CLK_TCK")
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+CLIENT_STAGES = ("navigation", "http_fetch") # Scraper timings that are one page load each
+
+def bulk_urls(template, count):
+    return "\n".join(template.format(n=n) for n in range(count))
+
+# name -> (platform, method, argument builder taking the bulk size)
+SCENARIOS = {
+    "amazon.search": ("amazon", "run_search", lambda size: "https://www.amazon.in/s?k=sandwich+maker"),
+    "amazon.bulk": ("amazon", "run_bulk", lambda size: bulk_urls("https://www.amazon.in/dp/B0MOCK{n:04d}", size)),
+    "amazon.reviews": ("amazon", "run_reviews", lambda size: "https://www.amazon.in/dp/B0MOCK0001"),
+    "flipkart.search": ("flipkart", "run_search", lambda size: "sandwich maker"),
+    "flipkart.bulk": ("flipkart", "run_bulk", lambda size: bulk_urls("https://www.flipkart.com/item-{n}/p/itm{n:04d}?pid=MOCK{n:05d}", size)),
+    "zepto.search": ("zepto", "run_search", lambda size: "milk"),
+    "zepto.bulk": ("zepto", "run_bulk", lambda size: bulk_urls("https://zeptonow.com/pn/item-{n}/pvid/mock-{n:05d}", size)),
+    "jiomart.search": ("jiomart", "run_search", lambda size: "milk"),
+    "jiomart.bulk": ("jiomart", "run_bulk", lambda size: bulk_urls("https://www.jiomart.com/p/groceries/item-{n}/{n:06d}", size)),
+    "blinkit.search": ("blinkit", "run_search", lambda size: "milk"),
+    "blinkit.bulk": ("blinkit", "run_bulk", lambda size: bulk_urls("https://blinkit.com/prn/item-{n}/prid/{n:06d}", size)),
+    "swiggy.search": ("swiggy", "run_search", lambda size: "milk"),
+    "swiggy.bulk": ("swiggy", "run_bulk", lambda size: bulk_urls("https://www.swiggy.com/instamart/item/MOCK{n:05d}", size)),
+    "bigbasket.search": ("bigbasket", "run_search", lambda size: "milk"),
+    "bigbasket.bulk": ("bigbasket", "run_bulk", lambda size: bulk_urls("https://www.bigbasket.com/pd/{n:06d}/item-{n}/", size)),
+}
+# Only Amazon scrapes reviews; the other platforms' run_reviews only report that they have none
+
+def _children():
+    """pid -> ppid for every process, read from /proc."""
+    parents = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit(): continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+            parents[int(entry)] = int(fields[1])
+        except (OSError, IndexError): continue
+    return parents
+
+def _descendants(root):
+    parents = _children()
+    found, frontier = set(), {root}
+    while frontier:
+        frontier = {pid for pid, ppid in parents.items() if ppid in frontier} - found
+        found |= frontier
+    return found
+
+def _proc_stat(pid):
+    """(rss bytes, cpu seconds) of one process."""
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    return int(fields[21]) * PAGE_SIZE, (int(fields[11]) + int(fields[12])) / CLK_TCK
+
+class ResourceSampler:
+    """Samples the RSS of this process plus its descendants (the Playwright driver and Chromium), and
+    the CPU time the descendants have used, every `interval` seconds."""
+    def __init__(self, interval=0.2):
+        self.interval = interval
+        self.peak_rss = 0
+        self.cpu_start = {}
+        self.cpu = {}
+        self._stop = threading.Event()
+
+    def sample(self):
+        rss = 0
+        for pid in {os.getpid()} | _descendants(os.getpid()):
+            try:
+                pid_rss, pid_cpu = _proc_stat(pid)
+            except (OSError, IndexError): continue
+            rss += pid_rss
+            if pid != os.getpid(): self.cpu[pid] = pid_cpu
+        self.peak_rss = max(self.peak_rss, rss)
+
+    def __enter__(self):
+        self.sample()
+        self.cpu_start = dict(self.cpu) # Browsers already running count from here
+        threading.Thread(target=self._run, name="resource-sampler", daemon=True).start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval): self.sample()
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self.sample()
+
+    def browser_cpu(self):
+        return sum(cpu - self.cpu_start.get(pid, 0) for pid, cpu in self.cpu.items())
+
+def percentile(values, pct):
+    if not values: return None
+    if len(values) == 1: return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[pct - 1]
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_scenario(name, site, thread, jobs, bulk_size):
+    from scrapers.registry import SCRAPERS
+    platform, method, build = SCENARIOS[name]
+    job_id = f"bench-{uuid.uuid4().hex[:8]}"
+    jobs.create(job_id, status="Queued", done=False)
+    scraper = SCRAPERS[platform](job_id, jobs)
+    scraper.max_staleness = 0 # Every page must come from the mock site
+    scraper.job_type = method.removeprefix("run_")
+    load_ms = []
+    record_timing = scraper.record_timing
+    def timing(key, seconds):
+        if key in CLIENT_STAGES: load_ms.append(seconds * 1000)
+        record_timing(key, seconds)
+    scraper.record_timing = timing
+    site.reset()
+    with ResourceSampler() as sampler:
+        start = time.perf_counter()
+        thread.run(getattr(scraper, method)(build(bulk_size)))
+        wall = time.perf_counter() - start
+    served = site.stats()
+    record = jobs.get(job_id, {})
+    return {
+        "status": record.get("status"),
+        "ok": record.get("status") == "Done!",
+        "wall_s": round(wall, 3),
+        "pages": served["pages"],
+        "requests": served["requests"],
+        "faults": served["faults"],
+        "pages_per_s": round(served["pages"] / wall, 3) if wall else None,
+        "p50_ms": round(percentile(load_ms, 50), 1) if load_ms else None,
+        "p95_ms": round(percentile(load_ms, 95), 1) if load_ms else None,
+        "server_p50_ms": round(percentile(served["latencies_ms"], 50) or 0, 1),
+        "server_p95_ms": round(percentile(served["latencies_ms"], 95) or 0, 1),
+        "peak_rss_mb": round(sampler.peak_rss / 2**20, 1),
+        "browser_cpu_s": round(sampler.browser_cpu(), 2),
+        "fetch": record.get("fetch"),
+        "timings": record.get("timings"),
+    }
+
+def previous_run(path, commit):
+    """Last result line in the file from another commit, for the comparison column."""
+    if not os.path.exists(path): return None
+    last = None
+    with open(path) as f:
+        for line in f:
+            try:
+                run = json.loads(line)
+            except ValueError: continue
+            if run.get("commit") != commit: last = run
+    return last
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline scraper benchmark against a local mock site")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Comma-separated, from: " + ", ".join(SCENARIOS))
+    parser.add_argument("--bulk-size", type=int, default=30, help="URLs per bulk scenario")
+    parser.add_argument("--cards", type=int, default=20, help="Results per search page")
+    parser.add_argument("--reviews", type=int, default=120, help="Reviews per product")
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--jitter-ms", type=float, default=20)
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--rate-captcha", type=float, default=0.0)
+    parser.add_argument("--rate-503", type=float, default=0.0)
+    parser.add_argument("--rate-signin", type=float, default=0.0)
+    parser.add_argument("--rate-limit", action="store_true", help="Keep the per-domain rate limiter on (off by default, it would dominate the numbers)")
+    parser.add_argument("--fixtures", default=REPO_DIR, help="Directory holding the debug_*.html pages")
+    parser.add_argument("--output", default=os.path.join(REPO_DIR, "bench_results.jsonl"))
+    parser.add_argument("--label", default=None, help="Free-form note stored with the run")
+    args = parser.parse_args(argv)
+    names = [n.strip() for n in args.scenarios.split(",") if n.strip()]
+    unknown = [n for n in names if n not in SCENARIOS]
+    if unknown: parser.error(f"unknown scenarios: {', '.join(unknown)}")
+
+    site = MockSite(args.fixtures, cards=args.cards, reviews_total=args.reviews, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                    rate_429=args.rate_429, rate_captcha=args.rate_captcha, rate_unavailable=args.rate_503, rate_signin=args.rate_signin).start()
+    workdir = tempfile.mkdtemp(prefix="scraper-bench-")
+    # Stores and outputs go to a scratch directory; the scrapers read these when first imported
+    os.environ.update({
+        "SITE_OVERRIDE": site.url, "HEADLESS": "1",
+        "JOB_STORE_PATH": os.path.join(workdir, "jobs.db"), "CHECKPOINT_PATH": os.path.join(workdir, "checkpoints.db"),
+        "DETAIL_CACHE_PATH": os.path.join(workdir, "detail_cache.db"), "REVIEW_STORE_PATH": os.path.join(workdir, "reviews.db"),
+        "METRICS_DIR": os.path.join(workdir, "metrics"), "OUTPUT_DIR": workdir,
+    })
+    if not args.rate_limit: os.environ["RATE_LIMIT"] = "0"
+    os.chdir(workdir)
+    from scrapers.browser_pool import PoolThread, pool_from_env
+    from scrapers.job_store import JOB_STORE
+
+    commit = git_commit()
+    thread = PoolThread(pool_from_env(), name="bench-loop").start()
+    results = {}
+    try:
+        for name in names:
+            print(f"-- {name}", flush=True)
+            results[name] = run_scenario(name, site, thread, JOB_STORE, args.bulk_size)
+    finally:
+        thread.stop()
+        site.stop()
+
+    run = {"commit": commit, "label": args.label, "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+           "settings": {k: v for k, v in vars(args).items() if k not in ("output", "fixtures", "label")}, "scenarios": results}
+    before = previous_run(args.output, commit)
+    with open(args.output, "a") as f:
+        f.write(json.dumps(run) + "\n")
+
+    print(f"\n{'scenario':<18}{'ok':>4}{'pages':>7}{'pages/s':>9}{'p50 ms':>8}{'p95 ms':>8}{'srv p95':>9}{'peak MB':>9}{'cpu s':>7}{'vs ' + ((before or {}).get('commit') or '-'):>14}")
+    for name, r in results.items():
+        old = ((before or {}).get("scenarios") or {}).get(name) or {}
+        delta = f"{(r['pages_per_s'] / old['pages_per_s'] - 1) * 100:+.0f}%" if old.get("pages_per_s") and r["pages_per_s"] else "-"
+        print(f"{name:<18}{'yes' if r['ok'] else 'NO':>4}{r['pages']:>7}{r['pages_per_s']:>9}{r['p50_ms'] or '-':>8}{r['p95_ms'] or '-':>8}{r['server_p95_ms']:>9}{r['peak_rss_mb']:>9}{r['browser_cpu_s']:>7}{delta:>14}")
+    print(f"\nResults appended to {args.output}")
+
+if __name__ == "__main__":
+    main()
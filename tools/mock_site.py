@@ -0,0 +1,227 @@
+# Local stand-in for the e-commerce sites, for offline benchmarks. Requests are addressed as
+# http://127.0.0.1:<port>/<real host><path>?<query> (see resource_policy.apply_site_override) and
+# answered from the saved debug pages plus small templates shaped like what html_extract reads.
+# Latency, jitter, 429s, CAPTCHAs, 503s and sign-in walls are injected at configurable rates.
+import hashlib
+import html
+import json
+import random
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from scrapers.canonical import amazon_asin
+
+FIXTURES = {
+    "card": "debug_first_card.html", # One Amazon search result card
+    "unavailable": "debug_page_dump.html", # Amazon's 503 robot page
+    "signin": "debug_reviews_page.html", # Amazon's two-step verification wall
+}
+FIXTURE_ASIN = "B0DN162F92"
+
+CAPTCHA_PAGE = """<html><head><title>Amazon.in</title></head><body>
+<form method="get" action="/errors/validateCaptcha"><h4>Enter the characters you see below</h4></form></body></html>"""
+
+AMAZON_PRODUCT = """<html><head><title>{name}</title></head><body>
+<span id="productTitle">{name}</span>
+<span class="a-price"><span class="a-price-whole">{price}.</span></span>
+<span class="a-icon-alt">{rating} out of 5 stars</span>
+<span id="acrCustomerReviewText">{ratings} ratings</span>
+<div id="social-proofing-faceout-title-text"><span>{bought}+ bought in past month</span></div>
+<ul><li>Best Sellers Rank: #{rank} in Home &amp; Kitchen (See Top 100)</li><li>#{rank2} in Sandwich Makers</li></ul>
+</body></html>"""
+
+AMAZON_REVIEW = """<div data-hook="review" id="{review_id}">
+<span class="a-profile-name">Reviewer {n}</span>
+<i data-hook="review-star-rating"><span class="a-icon-alt">{stars}.0 out of 5 stars</span></i>
+<span data-hook="review-date">Reviewed in India on {day} January 2026</span>
+<span data-hook="review-body"><span>Review {n} of {asin}. Works as described, would buy again.</span></span>
+</div>"""
+
+AMAZON_REVIEWS = """<html><head><title>Customer reviews</title></head><body>
+<div data-hook="cr-filter-info-review-rating-count">{ratings} total ratings, {total} with reviews</div>
+{reviews}</body></html>"""
+
+FLIPKART_PRODUCT = """<html><head><title>{name}</title>
+<script type="application/ld+json">{ld}</script></head><body>
+<h1 class="yhB1nd">{name}</h1><div class="Nx9bqj CxhGGd">₹{price_text}</div>
+<div class="XQDdHH">{rating}</div><span class="Wphh3N">{rating} {ratings_text} Ratings</span>
+</body></html>"""
+
+# Quick-commerce product pages: h1 name plus each platform's price hooks
+GENERIC_PRODUCT = """<html><head><title>{name}</title></head><body>
+<h1 class="product-title-name">{name}</h1>
+<div data-testid="product-price">₹{price}</div>
+<div class="product-price"><span class="price">₹{price}</span></div>
+<div data-qa="productPrice">Rs {price}</div>
+<span class="rating-count">{ratings} ratings</span>
+</body></html>"""
+
+HOME_PAGE = "<html><head><title>Home</title></head><body><h1>Home</h1></body></html>"
+
+# Quick-commerce search: (path prefix, where the keyword is, card markup shaped like extractors.py reads it)
+QUICK_SEARCH = {
+    "zeptonow.com": ("/search", "query", '<a data-testid="product-card" href="/pn/{slug}/pvid/{id}"><h5>{name}</h5>'
+                                         '<div data-testid="product-price">₹{price}</div></a>'),
+    "jiomart.com": ("/search/", None, '<li class="ais-InfiniteHits-item"><a class="plp-card-wrapper" href="/p/groceries/{slug}/{id}">'
+                                      '<div class="plp-card-details-name">{name}</div><span class="plp-card-details-price-discounted">₹{price}</span></a></li>'),
+    "blinkit.com": ("/s/", "q", '<a data-test-id="plp-product-item" href="/prn/{slug}/prid/{id}"><div>{name}</div><div>₹{price}</div></a>'),
+    "swiggy.com": ("/instamart/search", "query", '<div data-testid="product_card"><a href="/instamart/item/{id}"><div>{name}</div><div>₹{price}</div></a></div>'),
+    "bigbasket.com": ("/ps/", "q", '<div class="sku-card"><a href="/pd/{id}/{slug}/"><div>{name}</div><div>MRP ₹{price}</div></a></div>'),
+}
+
+def _seed(*parts):
+    return int(hashlib.md5("/".join(map(str, parts)).encode()).hexdigest()[:8], 16)
+
+def _product_numbers(key):
+    rng = random.Random(_seed(key))
+    return {"price": rng.randint(99, 9999), "rating": round(rng.uniform(3.0, 4.9), 1), "ratings": rng.randint(10, 50000),
+            "bought": rng.choice((50, 100, 500, 1000)), "rank": rng.randint(1, 5000), "rank2": rng.randint(1, 200)}
+
+def _asin(n):
+    return f"B0MOCK{n:04d}"
+
+class MockSite:
+    """Threaded HTTP server holding the fault settings. `stats()` reports what it served."""
+    def __init__(self, fixtures_dir=".", cards=20, reviews_total=120, latency_ms=0, jitter_ms=0,
+                 rate_429=0.0, rate_captcha=0.0, rate_unavailable=0.0, rate_signin=0.0, seed=0):
+        self.fixtures = {}
+        for name, fname in FIXTURES.items():
+            with open(f"{fixtures_dir}/{fname}", encoding="utf-8", errors="replace") as f:
+                self.fixtures[name] = f.read()
+        self.cards = cards
+        self.reviews_total = reviews_total
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.faults = {"429": rate_429, "captcha": rate_captcha, "unavailable": rate_unavailable, "signin": rate_signin}
+        self.random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.reset()
+        self.server = None
+
+    def reset(self):
+        with self._lock:
+            self.requests = 0
+            self.pages = 0 # Documents served with real content
+            self.faults_served = {}
+            self.latencies = [] # Server-side ms per request, including injected delay
+
+    def start(self, port=0):
+        site = self
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self): site.handle(self)
+            def log_message(self, *args): pass
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, name="mock-site", daemon=True).start()
+        return self
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def stop(self):
+        if self.server: self.server.shutdown()
+
+    def handle(self, request):
+        start = time.perf_counter()
+        with self._lock:
+            delay = max(0.0, self.latency_ms + self.random.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+            roll = self.random.random()
+        host, _, rest = request.path.lstrip("/").partition("/")
+        parts = urllib.parse.urlsplit("/" + rest)
+        status, body, fault = 200, None, None
+        if self._is_document(parts.path):
+            fault = self._pick_fault(roll)
+            if fault == "429": status, body = 429, "<html><body>Too Many Requests</body></html>"
+            elif fault == "captcha": body = CAPTCHA_PAGE
+            elif fault == "unavailable": status, body = 503, self.fixtures["unavailable"]
+            elif fault == "signin": body = self.fixtures["signin"]
+            else: body = self.page(host, parts.path, urllib.parse.parse_qs(parts.query))
+        if delay: time.sleep(delay)
+        if body is None: status, body = 404, ""
+        data = body.encode("utf-8")
+        request.send_response(status)
+        request.send_header("Content-Type", "text/html; charset=utf-8")
+        request.send_header("Content-Length", str(len(data)))
+        request.end_headers()
+        request.wfile.write(data)
+        with self._lock:
+            self.requests += 1
+            if fault: self.faults_served[fault] = self.faults_served.get(fault, 0) + 1
+            elif status == 200 and body: self.pages += 1
+            self.latencies.append((time.perf_counter() - start) * 1000)
+
+    def _is_document(self, path):
+        return not path.rsplit("/", 1)[-1].count(".") or path.endswith(".html")
+
+    def _pick_fault(self, roll):
+        for name, rate in self.faults.items():
+            if roll < rate: return name
+            roll -= rate
+        return None
+
+    def page(self, host, path, query):
+        """HTML for a document path on a real host, or None for a 404."""
+        host = host.removeprefix("www.")
+        if path in ("", "/"): return HOME_PAGE
+        if host == "amazon.in":
+            if path == "/s": return self.amazon_search(query.get("k", [""])[0])
+            if path.startswith("/product-reviews/"):
+                return self.amazon_reviews(path.split("/")[2], query.get("filterByStar", ["all_stars"])[0], int(query.get("pageNumber", ["1"])[0]))
+            # Product pages, including the sponsored /sspa/click links the search fixture carries
+            asin = amazon_asin(f"{path}?{urllib.parse.urlencode(query, doseq=True)}")
+            return AMAZON_PRODUCT.format(name=f"Mock product {asin}", **_product_numbers(asin)) if asin else None
+        if host == "flipkart.com":
+            if path == "/search": return self.flipkart_search(query.get("q", [""])[0])
+            pid = query.get("pid", [None])[0]
+            return self.flipkart_product(pid) if pid else None
+        if host in QUICK_SEARCH and path.startswith(QUICK_SEARCH[host][0]):
+            prefix, param = QUICK_SEARCH[host][:2]
+            return self.quick_search(host, query.get(param, [""])[0] if param else urllib.parse.unquote(path[len(prefix):]))
+        key = path.rstrip("/").rsplit("/", 1)[-1]
+        return GENERIC_PRODUCT.format(name=f"Mock {host} item {key}", **_product_numbers(key))
+
+    def amazon_search(self, keyword):
+        cards = []
+        for n in range(self.cards):
+            asin = _asin(_seed(keyword, n) % 10000)
+            card = self.fixtures["card"].replace(FIXTURE_ASIN, asin)
+            cards.append(f'<div data-component-type="s-search-result" data-asin="{asin}">{card}</div>')
+        return f"<html><head><title>Amazon.in : {html.escape(keyword)}</title></head><body>{''.join(cards)}</body></html>"
+
+    def amazon_reviews(self, asin, star, page_num):
+        # Each star filter gets an equal share of the reviews so split fetches add up to the total
+        total = self.reviews_total if star == "all_stars" else self.reviews_total // 5
+        first = (page_num - 1) * 10
+        reviews = [AMAZON_REVIEW.format(review_id=f"R{_seed(asin, star, n):08X}", n=n, asin=asin, day=1 + n % 28,
+                                        stars=5 - n % 5 if star == "all_stars" else 1)
+                   for n in range(first, min(first + 10, total))]
+        return AMAZON_REVIEWS.format(ratings=total * 3, total=total, reviews="".join(reviews))
+
+    def flipkart_search(self, keyword):
+        cards = []
+        for n in range(self.cards):
+            pid = f"MOCK{_seed(keyword, n) % 100000:05d}"
+            cards.append(f'<div data-id="{pid}"><a href="/mock-item-{n}/p/itm{n:04d}?pid={pid}">Item {n}</a></div>')
+        return f"<html><head><title>{html.escape(keyword)} - Flipkart</title></head><body>{''.join(cards)}</body></html>"
+
+    def flipkart_product(self, pid):
+        numbers = _product_numbers(pid)
+        name = f"Mock Flipkart product {pid}"
+        ld = json.dumps([{"@type": "Product", "name": name, "offers": {"price": numbers["price"]},
+                          "aggregateRating": {"ratingValue": numbers["rating"], "reviewCount": numbers["ratings"]}}])
+        return FLIPKART_PRODUCT.format(name=name, ld=ld, price_text=f"{numbers['price']:,}", rating=numbers["rating"],
+                                       ratings_text=f"{numbers['ratings']:,}")
+
+    def quick_search(self, host, keyword):
+        cards = []
+        for n in range(self.cards):
+            key = f"{_seed(host, keyword, n) % 1000000:06d}"
+            name = f"Mock {host} item {key}"
+            cards.append(QUICK_SEARCH[host][2].format(slug=f"mock-item-{n}", id=key, name=name, price=_product_numbers(key)["price"]))
+        return f"<html><head><title>{html.escape(keyword)}</title></head><body>{''.join(cards)}</body></html>"
+
+    def stats(self):
+        with self._lock:
+            return {"requests": self.requests, "pages": self.pages, "faults": dict(self.faults_served), "latencies_ms": list(self.latencies)}